@@ -3,32 +3,41 @@ from app.authentication import CognitoAuthManager, render_auth_ui
 from app.ui.chat_interface import render_chat_interface
 from app.ui.sidebar import SidebarManager
 from app.chat_history_db import ChatSessionManagerDynamoDB
+from app.services.metrics import start_metrics_server
+from app.services.rerun_profiler import phase, profile_rerun
 import streamlit as st
 
 
 def main():
-    session_handler = ChatSessionManagerDynamoDB()
-    auth_manager = CognitoAuthManager()
-    sidebar = SidebarManager(session_handler)
-    st.set_page_config(page_title="Chatbot Arena", page_icon="🤖", layout="wide")
-    session_handler.load_custom_css()
+    # No-op unless METRICS_PORT is set; only the first run starts the server
+    start_metrics_server()
 
-    # Initialize session state
-    session_handler.initialize_session_state()
-    session_handler.session_initialized()
+    # Admins can switch on per-rerun profiling from the sidebar
+    with profile_rerun(st.session_state):
+        with phase("session_init"):
+            session_handler = ChatSessionManagerDynamoDB()
+            auth_manager = CognitoAuthManager()
+            sidebar = SidebarManager(session_handler)
+            st.set_page_config(page_title="Chatbot Arena", page_icon="🤖", layout="wide")
+            session_handler.load_custom_css()
 
-    render_auth_ui(
-            auth_manager.sign_up_user,
-            auth_manager.confirm_user_signup,
-            auth_manager.authenticate_user,
-            auth_manager.initiate_forgot_password,
-            auth_manager.confirm_forgot_password,
-        )
+            # Initialize session state
+            session_handler.initialize_session_state()
+            session_handler.session_initialized()
 
+        with phase("auth_ui"):
+            render_auth_ui(
+                    auth_manager.sign_up_user,
+                    auth_manager.confirm_user_signup,
+                    auth_manager.authenticate_user,
+                    auth_manager.initiate_forgot_password,
+                    auth_manager.confirm_forgot_password,
+                )
 
-    sidebar.render_sidebar()
-    # Main chat interface
-    render_chat_interface()
+        with phase("sidebar"):
+            sidebar.render_sidebar()
+        # Main chat interface
+        render_chat_interface(session_handler)
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,10 @@
-import boto3
 import os
 import streamlit as st
 from dotenv import load_dotenv
 from botocore.exceptions import ClientError
 import re
+from app.services.aws_clients import get_client
+from app.services import metrics
 
 load_dotenv()
 
@@ -11,12 +12,13 @@ load_dotenv()
 class CognitoAuthManager:
     def __init__(self):
         self.client_id = "du26ieo2nhqavv9e50jmhjmfi"
-        self.client = boto3.client("cognito-idp", region_name="us-east-1")
+        self.client = get_client("cognito-idp", "us-east-1")
 
     @staticmethod
     def is_valid_email(email):
         return re.match(r"[^@]+@[^@]+\.[^@]+", email)
 
+    @metrics.timed("arena_cognito_call_seconds", operation="sign_up")
     def sign_up_user(self, username, password):
         try:
             self.client.sign_up(
@@ -36,6 +38,7 @@ class CognitoAuthManager:
             else:
                 return f"❌ Sign-up failed: {e.response['Error']['Message']}"
 
+    @metrics.timed("arena_cognito_call_seconds", operation="confirm_sign_up")
     def confirm_user_signup(self, username, confirmation_code):
         try:
             self.client.confirm_sign_up(
@@ -57,6 +60,7 @@ class CognitoAuthManager:
             else:
                 return f"❌ Confirmation failed: {e.response['Error']['Message']}"
 
+    @metrics.timed("arena_cognito_call_seconds", operation="initiate_auth")
     def authenticate_user(self, username, password):
         try:
             response = self.client.initiate_auth(
@@ -76,6 +80,7 @@ class CognitoAuthManager:
             else:
                 return f"❌ Login failed: {e.response['Error']['Message']}"
 
+    @metrics.timed("arena_cognito_call_seconds", operation="forgot_password")
     def initiate_forgot_password(self, username):
         try:
             self.client.forgot_password(
@@ -92,6 +97,7 @@ class CognitoAuthManager:
             else:
                 return f"❌ Failed to initiate reset: {e.response['Error']['Message']}"
 
+    @metrics.timed("arena_cognito_call_seconds", operation="confirm_forgot_password")
     def confirm_forgot_password(self, username, code, new_password):
         try:
             self.client.confirm_forgot_password(
@@ -1,17 +1,52 @@
-import boto3
+import os
+from boto3.dynamodb.conditions import Key
 from datetime import datetime
 import uuid
 import streamlit as st
 from botocore.exceptions import ClientError
 import json
-from decimal import Decimal
 import collections.abc
+from app.services.aws_clients import get_resource
+from app.services.summarizer import get_summarizer
+from app.services import metrics
+from app.services import transcript_codec
+from app.services.session_serializer import deserialize_message, deserialize_session, serialize_message, serialize_session
+
+# One item per message, keyed by "<user_id>#<session_id>" and a sequence number
+CHAT_TURNS_TABLE = os.getenv("CHAT_TURNS_TABLE", "Arena-ChatTurns")
+TURN_PAGE_SIZE = int(os.getenv("TURN_PAGE_SIZE", "100"))
+# Store messages whose JSON exceeds the minimum as a compressed binary attribute,
+# keeping long multi-model turns under DynamoDB's 400 KB item limit
+TRANSCRIPT_COMPRESSION = os.getenv("TRANSCRIPT_COMPRESSION", "false").lower() in ("1", "true", "yes")
+TRANSCRIPT_COMPRESS_MIN_BYTES = int(os.getenv("TRANSCRIPT_COMPRESS_MIN_BYTES", "1024"))
+
+# What the Session History list reads; everything else stays on the server
+SESSION_SUMMARY_FIELDS = ("session_id", "session_name", "created_at", "updated_at", "turn_count", "preview")
+PREVIEW_MESSAGES = 3
+PREVIEW_CHARS = 100
+# GSI on the sessions table (partition key user_id, sort key created_at) that
+# projects SESSION_SUMMARY_FIELDS, so history pages come back newest first
+SESSIONS_CREATED_INDEX = os.getenv("SESSIONS_CREATED_INDEX", "user_id-created_at-index")
+SESSION_PAGE_SIZE = int(os.getenv("SESSION_PAGE_SIZE", "20"))
 
 class ChatSessionManagerDynamoDB:
-    def __init__(self, table_name='Arena-ChatSessions', region_name='us-east-1'):
+    def __init__(self, table_name='Arena-ChatSessions', region_name='us-east-1', turns_table_name=CHAT_TURNS_TABLE,
+                 compress_transcripts=TRANSCRIPT_COMPRESSION):
         self.table_name = table_name
-        self.dynamodb = boto3.resource('dynamodb', region_name=region_name)
-        self.table = self.dynamodb.Table(table_name)
+        self.region_name = region_name
+        self.turns_table_name = turns_table_name
+        self.compress_transcripts = compress_transcripts
+
+    # boto3 resources are not thread-safe and this manager is also used from the
+    # summarizer's thread, so tables come from the calling thread's resource.
+    @property
+    def table(self):
+        # Session metadata items; the messages themselves live in the turns table
+        return get_resource('dynamodb', self.region_name).Table(self.table_name)
+
+    @property
+    def turns_table(self):
+        return get_resource('dynamodb', self.region_name).Table(self.turns_table_name)
 
     def initialize_session_state(self):
         st.set_page_config(page_title="Chatbot Arena", page_icon="🤖", layout="wide")
@@ -85,53 +120,187 @@ class ChatSessionManagerDynamoDB:
         </style>
         """, unsafe_allow_html=True)
 
-    
-    def convert_floats_to_decimal(self, obj):
-        """Recursively convert all float values to Decimal in a nested structure."""
-        if isinstance(obj, float):
-            return Decimal(str(obj))
-        elif isinstance(obj, dict):
-            return {k: self.convert_floats_to_decimal(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self.convert_floats_to_decimal(i) for i in obj]
-        elif isinstance(obj, tuple):
-            return tuple(self.convert_floats_to_decimal(i) for i in obj)
-        else:
-            return obj
 
+    @metrics.timed("arena_session_save_seconds")
     def save_session(self):
         if not st.session_state.get('save_data_enabled', False):
             return
     
+        user_id = st.session_state.user_id
+        session_id = st.session_state.session_id
+        messages = st.session_state.messages
+        # Messages already written for this session are never rewritten
+        saved_turns = st.session_state.setdefault("saved_turns", {})
+        saved_count = saved_turns.get(session_id, 0)
+
         session_data = {
-            "user_id": st.session_state.user_id,
-            "session_id": st.session_state.session_id,
+            "user_id": user_id,
+            "session_id": session_id,
             "session_name": st.session_state.session_name,
             "created_at": st.session_state.created_at,
-            "messages": st.session_state.messages,
+            "updated_at": datetime.now().isoformat(),
+            "message_count": len(messages),
+            "turn_count": sum(1 for message in messages if message.get("role") == "user"),
+            "preview": self.build_preview(messages),
             "system_prompt": st.session_state.prev_system_prompt,
             "temperature": st.session_state.temperature,
             "selected_models": st.session_state.selected_models
         }
 
-        session_data_cleaned = self.convert_floats_to_decimal(session_data)
+        summary = get_summarizer().get(session_id)
+        if summary:
+            session_data["summary"] = summary
+
+        session_data_cleaned = serialize_session(session_data)
 
 
         try:
+            if len(messages) > saved_count:
+                self.append_turns(user_id, session_id, messages[saved_count:], saved_count)
+            # Written after the turns, so a legacy item's inline messages are only dropped once migrated
             self.table.put_item(Item=session_data_cleaned)
+            saved_turns[session_id] = len(messages)
+            # The history list is re-read the next time it is shown
+            st.session_state.session_history = None
         except ClientError as e:
             st.error(f"Error saving session to DynamoDB: {e}")
 
-    def load_all_sessions(self):
-        """Load all sessions belonging to the current user."""
+    @staticmethod
+    def build_preview(messages, count=PREVIEW_MESSAGES, width=PREVIEW_CHARS):
+        """Speaker / truncated text lines for the first `count` messages, as the history list shows them."""
+        def clip(text):
+            return f"{text[:width]}{'...' if len(text) > width else ''}"
+
+        preview = []
+        for message in messages[:count]:
+            if message.get("role") == "user":
+                preview.append({"speaker": "User", "text": clip(message["content"])})
+            elif message.get("role") == "assistant":
+                if "responses" in message:
+                    for model, response in message["responses"].items():
+                        preview.append({"speaker": model, "text": clip(response)})
+                elif "content" in message:
+                    preview.append({"speaker": "Assistant", "text": clip(message["content"])})
+        return preview
+
+    @staticmethod
+    def session_key(user_id, session_id):
+        return f"{user_id}#{session_id}"
+
+    def append_turns(self, user_id, session_id, messages, start_seq):
+        """Write each message as its own item, numbered from `start_seq`."""
+        session_key = self.session_key(user_id, session_id)
+        with self.turns_table.batch_writer() as batch:
+            for offset, message in enumerate(messages):
+                batch.put_item(Item=self._turn_item(session_key, start_seq + offset, message))
+
+    def _turn_item(self, session_key, seq, message):
+        item = {"session_key": session_key, "seq": seq}
+        if self.compress_transcripts:
+            raw = transcript_codec.dumps(message)
+            if len(raw) >= TRANSCRIPT_COMPRESS_MIN_BYTES:
+                item["message_blob"] = transcript_codec.pack(raw)
+                return item
+        item["message"] = serialize_message(message)
+        return item
+
+    @staticmethod
+    def _turn_message(item):
+        # Decoded whatever the current setting, so turns written either way stay readable
+        if "message_blob" in item:
+            return transcript_codec.decode(item["message_blob"])
+        return deserialize_message(item["message"])
+
+    def iter_turn_pages(self, user_id, session_id, page_size=TURN_PAGE_SIZE, start_seq=0):
+        """Yield a session's messages in order, one Query page at a time."""
+        query = {
+            "KeyConditionExpression": Key("session_key").eq(self.session_key(user_id, session_id)) & Key("seq").gte(start_seq),
+            "ScanIndexForward": True,
+            "Limit": page_size
+        }
+        while True:
+            response = self.turns_table.query(**query)
+            items = response.get("Items", [])
+            if items:
+                yield [self._turn_message(item) for item in items]
+            if "LastEvaluatedKey" not in response:
+                return
+            query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def first_messages(self, session_id, count):
+        """The first `count` messages of one of the current user's sessions, in a single small Query."""
+        try:
+            return next(self.iter_turn_pages(st.session_state.user_id, session_id, page_size=count), [])
+        except ClientError as e:
+            print(f"Error reading turns for session {session_id}: {e}")
+            return []
+
+    def load_preview(self, session_id):
+        """Build the preview of a session saved before previews were stored."""
+        messages = self.first_messages(session_id, PREVIEW_MESSAGES)
+        if not messages:
+            # Legacy item with its transcript inline: fetch only the first few list elements
+            try:
+                response = self.table.get_item(
+                    Key={"user_id": st.session_state.user_id, "session_id": session_id},
+                    ProjectionExpression=", ".join(f"#messages[{i}]" for i in range(PREVIEW_MESSAGES)),
+                    ExpressionAttributeNames={"#messages": "messages"}
+                )
+                messages = deserialize_session(response.get("Item", {})).get("messages", [])
+            except ClientError as e:
+                print(f"Error reading preview for session {session_id}: {e}")
+        return self.build_preview(messages)
+
+    def save_summary(self, user_id, session_id, summary):
+        """Attach a conversation summary to an already saved session.
+
+        Called from the summarizer's background thread, so errors are logged rather
+        than shown in the UI.
+        """
         try:
-            response = self.table.query(
-                KeyConditionExpression=boto3.dynamodb.conditions.Key('user_id').eq(st.session_state.user_id)
+            self.table.update_item(
+                Key={"user_id": user_id, "session_id": session_id},
+                UpdateExpression="SET summary = :summary",
+                ConditionExpression="attribute_exists(session_id)",
+                ExpressionAttributeValues={":summary": summary}
             )
-            return response.get("Items", [])
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                print(f"Error saving summary for session {session_id}: {e}")
+
+    @metrics.timed("arena_session_list_seconds")
+    def load_sessions_page(self, page_size=SESSION_PAGE_SIZE, start_key=None):
+        """One page of the current user's session summaries, newest first.
+
+        Returns (sessions, next_key); pass next_key back as start_key for the
+        following page. next_key is None once the last page has been read.
+        """
+        names = {f"#f{i}": field for i, field in enumerate(SESSION_SUMMARY_FIELDS)}
+        query = {
+            "IndexName": SESSIONS_CREATED_INDEX,
+            "KeyConditionExpression": Key("user_id").eq(st.session_state.user_id),
+            "ScanIndexForward": False,
+            "Limit": page_size,
+            "ProjectionExpression": ", ".join(names),
+            "ExpressionAttributeNames": names
+        }
+        if start_key is not None:
+            query["ExclusiveStartKey"] = start_key
+        try:
+            response = self.table.query(**query)
         except ClientError as e:
             st.error(f"Error fetching sessions: {e}")
-            return []
+            return [], None
+        sessions = [deserialize_session(item) for item in response.get("Items", [])]
+        return sessions, response.get("LastEvaluatedKey")
+
+    def load_all_sessions(self):
+        """Load the summary fields of all sessions belonging to the current user, newest first."""
+        sessions, next_key = self.load_sessions_page(page_size=100)
+        while next_key is not None:
+            page, next_key = self.load_sessions_page(page_size=100, start_key=next_key)
+            sessions.extend(page)
+        return sessions
 
     def load_session_by_id(self, session_id):
         """Load a specific session by ID for the current user."""
@@ -142,7 +311,22 @@ class ChatSessionManagerDynamoDB:
                     "session_id": session_id
                 }
             )
-            return response.get("Item", None)
+            item = response.get("Item", None)
+            if item is None:
+                return None
+            deserialize_session(item)
+            if "messages" in item:
+                # Saved before turns had their own items; the next save migrates it
+                saved_count = 0
+            else:
+                item["messages"] = [
+                    message
+                    for page in self.iter_turn_pages(st.session_state.user_id, session_id)
+                    for message in page
+                ]
+                saved_count = len(item["messages"])
+            st.session_state.setdefault("saved_turns", {})[session_id] = saved_count
+            return item
         except ClientError as e:
             st.error(f"Error loading session {session_id}: {e}")
             return None
@@ -156,6 +340,21 @@ class ChatSessionManagerDynamoDB:
                     "session_id": session_id
                 }
             )
+            session_key = self.session_key(st.session_state.user_id, session_id)
+            query = {
+                "KeyConditionExpression": Key("session_key").eq(session_key),
+                "ProjectionExpression": "session_key, seq"
+            }
+            with self.turns_table.batch_writer() as batch:
+                while True:
+                    response = self.turns_table.query(**query)
+                    for item in response.get("Items", []):
+                        batch.delete_item(Key={"session_key": session_key, "seq": item["seq"]})
+                    if "LastEvaluatedKey" not in response:
+                        break
+                    query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+            st.session_state.get("saved_turns", {}).pop(session_id, None)
+            st.session_state.session_history = None
             return True
         except ClientError as e:
             st.error(f"Error deleting session: {e}")
@@ -0,0 +1,144 @@
+import os
+import threading
+import boto3
+from botocore.config import Config
+from langchain_aws import ChatBedrockConverse
+from app.services.stream_executor import on_stream_cancel
+from app.services.fake_bedrock import FakeChatBedrock
+
+DEFAULT_REGION = "us-east-1"
+MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+TCP_KEEPALIVE = os.getenv("AWS_TCP_KEEPALIVE", "true").lower() in ("1", "true", "yes")
+# "fake" routes every chat model to the offline stand-in, e.g. for benchmarks
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "bedrock")
+
+
+class ClientRegistry:
+    """Process-wide cache of boto3 clients/resources and chat models.
+
+    boto3 clients are thread-safe, so a single pooled client per (service, region)
+    is shared by every Streamlit session and rerun instead of opening new TLS
+    connections each time. Resources are not, so each thread gets its own resource
+    object, all sharing that one pooled client.
+    """
+
+    def __init__(self, max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=TCP_KEEPALIVE):
+        self.config = Config(
+            max_pool_connections=max_pool_connections,
+            tcp_keepalive=tcp_keepalive,
+            retries={"mode": "standard"},
+        )
+        self._lock = threading.Lock()
+        # Session creation is not thread-safe; build everything from one session.
+        self._session = boto3.session.Session()
+        self._session_lock = threading.Lock()
+        self._entries = {}
+        self._stats = {}
+        self._local = threading.local()
+
+    def _count(self, kind, hit):
+        with self._lock:
+            stats = self._stats.setdefault(kind, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+
+    def _get_or_create(self, kind, key, factory):
+        with self._lock:
+            value = self._entries.get(key)
+        if kind is not None:
+            self._count(kind, value is not None)
+        if value is not None:
+            return value
+        # Factories may ask the registry for other entries (a chat model needs its
+        # client), so they run outside the lock; if two threads race, the first wins.
+        value = factory()
+        with self._lock:
+            return self._entries.setdefault(key, value)
+
+    def client(self, service, region=DEFAULT_REGION):
+        def create():
+            config = self.config
+            if service == "bedrock-runtime":
+                # Model streams are retried by app.services.retry, which knows whether a
+                # token was already shown; avoid multiplying attempts inside botocore.
+                config = config.merge(Config(retries={"mode": "standard", "total_max_attempts": 1}))
+            with self._session_lock:
+                client = self._session.client(service, region_name=region, config=config)
+            if service == "bedrock-runtime":
+                client.meta.events.register("after-call.bedrock-runtime.ConverseStream", _close_stream_on_cancel)
+            return client
+        return self._get_or_create("client", ("client", service, region), create)
+
+    def resource(self, service, region=DEFAULT_REGION):
+        """This thread's resource for `service`, built over the shared pooled client."""
+        resources = getattr(self._local, "resources", None)
+        if resources is None:
+            resources = self._local.resources = {}
+        resource = resources.get((service, region))
+        self._count("resource", resource is not None)
+        if resource is None:
+            def create():
+                with self._session_lock:
+                    return self._session.resource(service, region_name=region, config=self.config)
+            # Only used for its class and client; never handed out across threads
+            shared = self._get_or_create(None, ("resource", service, region), create)
+            resource = resources[(service, region)] = type(shared)(client=shared.meta.client)
+        return resource
+
+    def chat_model(self, model_id, region=DEFAULT_REGION, temperature=None):
+        def create():
+            return ChatBedrockConverse(
+                model_id=model_id,
+                region_name=region,
+                temperature=temperature,
+                client=self.client("bedrock-runtime", region),
+            )
+        return self._get_or_create("chat_model", ("chat_model", "bedrock-runtime", region, model_id, temperature), create)
+
+    def stats(self):
+        with self._lock:
+            report = {}
+            for kind, counts in self._stats.items():
+                total = counts["hits"] + counts["misses"]
+                report[kind] = {
+                    "hits": counts["hits"],
+                    "misses": counts["misses"],
+                    "hit_rate": counts["hits"] / total if total else 0.0,
+                }
+            return report
+
+
+def _close_stream_on_cancel(parsed, **kwargs):
+    # Runs on the worker thread that opened the stream; closing the EventStream
+    # releases the HTTP connection if the consumer gives up (e.g. on a deadline).
+    stream = parsed.get("stream") if isinstance(parsed, dict) else None
+    if stream is not None:
+        on_stream_cancel(stream.close)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ClientRegistry()
+    return _registry
+
+
+def get_client(service, region=DEFAULT_REGION):
+    return get_client_registry().client(service, region)
+
+
+def get_resource(service, region=DEFAULT_REGION):
+    return get_client_registry().resource(service, region)
+
+
+def get_chat_model(model_id, region=DEFAULT_REGION, temperature=None, backend=None, backend_options=None):
+    """Chat model for `model_id`: the pooled ChatBedrockConverse, or FakeChatBedrock when the
+    model's configured backend (or MODEL_BACKEND) is "fake"."""
+    if MODEL_BACKEND == "fake" or backend == "fake":
+        return FakeChatBedrock(model_id, temperature, **(backend_options or {}))
+    return get_client_registry().chat_model(model_id, region, temperature)
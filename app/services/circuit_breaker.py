@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, model_id, retry_after):
+        self.model_id = model_id
+        self.retry_after = retry_after
+        super().__init__(f"{model_id} is temporarily unavailable; retrying in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """Per-model breaker: opens after consecutive failures, fast-fails during a cool-down,
+    then lets a single probe request through (half-open) to decide whether to close again.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN_SECONDS,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def _state(self):
+        if self._opened_at is None:
+            return CLOSED
+        if self.clock() - self._opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def retry_after(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.cooldown - (self.clock() - self._opened_at))
+
+    def allow_request(self):
+        with self._lock:
+            state = self._state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._probe_in_flight = False
+
+    def record_abandoned(self):
+        """The request was cancelled by the caller; free the probe slot without a verdict."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model_id):
+    with _breakers_lock:
+        if model_id not in _breakers:
+            _breakers[model_id] = CircuitBreaker()
+        return _breakers[model_id]
+
+
+def breaker_state(model_id):
+    """State of a model's breaker without creating one for models never called."""
+    with _breakers_lock:
+        breaker = _breakers.get(model_id)
+    return breaker.state if breaker else CLOSED
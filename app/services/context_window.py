@@ -0,0 +1,70 @@
+import threading
+from langchain_core.messages import HumanMessage
+
+# Rough Bedrock-agnostic estimate: ~4 characters per token plus per-message framing.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+MAX_CACHED_ESTIMATES = 50000
+
+
+class ContextWindow:
+    """Keeps the system prompt plus the most recent turns within a token budget."""
+
+    def __init__(self, max_cached=MAX_CACHED_ESTIMATES):
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        # Keyed by message text: history messages are immutable once sent, so an
+        # estimate computed for one turn is reused on every later send.
+        self._estimates = {}
+
+    def estimate_text(self, text):
+        if not text:
+            return 0
+        with self._lock:
+            tokens = self._estimates.get(text)
+            if tokens is None:
+                if len(self._estimates) >= self.max_cached:
+                    self._estimates.clear()
+                tokens = len(text) // CHARS_PER_TOKEN + 1
+                self._estimates[text] = tokens
+        return tokens
+
+    def estimate_tokens(self, message):
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        return self.estimate_text(content) + MESSAGE_OVERHEAD_TOKENS
+
+    def fit(self, system_content, messages, budget, shape, prompt=None):
+        """Return (prompt, dropped_turns) for `messages` under `budget` tokens.
+
+        Turns are dropped oldest-first, a turn being a user message and the replies
+        that follow it. The newest user turn is always kept, even if it alone is over
+        budget. `prompt` is the already-shaped full prompt, reused when nothing is dropped.
+        """
+        if not budget or not messages:
+            return (prompt if prompt is not None else shape(system_content, messages)), 0
+
+        used = self.estimate_text(system_content) + MESSAGE_OVERHEAD_TOKENS
+        start = None
+        kept_turns = 0
+        for index in range(len(messages) - 1, -1, -1):
+            used += self.estimate_tokens(messages[index])
+            if used > budget and start is not None:
+                break
+            if isinstance(messages[index], HumanMessage):
+                start = index
+                kept_turns += 1
+                if used > budget:
+                    break
+
+        if start is None or start == 0:
+            return (prompt if prompt is not None else shape(system_content, messages)), 0
+
+        total_turns = kept_turns + sum(1 for i in range(start) if isinstance(messages[i], HumanMessage))
+        return shape(system_content, messages[start:]), total_turns - kept_turns
+
+
+_context_window = ContextWindow()
+
+
+def get_context_window():
+    return _context_window
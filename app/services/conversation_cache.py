@@ -0,0 +1,87 @@
+from langchain_core.messages import HumanMessage, AIMessage
+
+
+class _ModelHistory:
+    def __init__(self):
+        self.messages = []
+        self.turn_starts = []
+        self.prompt = None
+        self.system_content = None
+        self.consumed = 0
+        self.last_entry = None
+
+
+class ConversationCache:
+    """Per-session LangChain message lists, extended by one turn per send.
+
+    Each model key keeps its Human/AI history plus the prompt shaped for the model
+    (system prompt folded in), so a send only converts the entries added since the
+    previous one. The cache resets when the session or system prompt changes, and
+    a model's history is rebuilt if the transcript it was built from was replaced.
+    Returned lists are shared with the cache and must not be mutated by callers.
+    """
+
+    def __init__(self):
+        self.session_id = None
+        self.system_prompt = None
+        self._histories = {}
+
+    def sync(self, session_id, system_prompt):
+        if session_id != self.session_id or system_prompt != self.system_prompt:
+            self.session_id = session_id
+            self.system_prompt = system_prompt
+            self._histories = {}
+
+    def _is_current(self, history, chat_history):
+        if history.consumed > len(chat_history):
+            return False
+        return history.consumed == 0 or chat_history[history.consumed - 1] is history.last_entry
+
+    def _append(self, history, message, shape):
+        history.messages.append(message)
+        if isinstance(message, HumanMessage):
+            history.turn_starts.append(len(history.messages) - 1)
+        if history.prompt is None or len(history.messages) == 1:
+            history.prompt = shape(history.system_content, history.messages)
+        elif history.prompt is not history.messages:
+            history.prompt.append(message)
+
+    def _extend(self, history, key, chat_history, shape):
+        for entry in chat_history[history.consumed:]:
+            role = entry.get("role")
+            if role == "system":
+                history.system_content = entry.get("content") or self.system_prompt
+                history.prompt = shape(history.system_content, history.messages)
+            elif role == "user":
+                self._append(history, HumanMessage(content=entry.get("content")), shape)
+            elif role == "assistant":
+                responses = entry.get("responses", {})
+                if key in responses:
+                    self._append(history, AIMessage(content=responses[key]), shape)
+        if len(chat_history) > history.consumed:
+            history.consumed = len(chat_history)
+            history.last_entry = chat_history[-1]
+
+    def histories(self, chat_history, model_keys, shape):
+        """Return {key: {"system_content", "messages", "turn_starts", "prompt"}} for the given model keys.
+
+        `shape(system_content, messages)` builds the model prompt from the raw history
+        and must return the history's tail unchanged, so later turns can be appended.
+        """
+        result = {}
+        for key in model_keys:
+            history = self._histories.get(key)
+            if history is None or not self._is_current(history, chat_history):
+                history = _ModelHistory()
+                history.system_content = self.system_prompt
+                self._histories[key] = history
+            self._extend(history, key, chat_history, shape)
+            if history.prompt is None:
+                history.prompt = shape(history.system_content, history.messages)
+            result[key] = {
+                "system_content": history.system_content,
+                "messages": history.messages,
+                "turn_starts": history.turn_starts,
+                "prompt": history.prompt,
+            }
+        return result
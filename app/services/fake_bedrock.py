@@ -0,0 +1,88 @@
+import os
+import random
+import threading
+from botocore.exceptions import ClientError
+from langchain_core.messages import AIMessage, AIMessageChunk
+from app.services.stream_executor import on_stream_cancel
+
+# Defaults for every fake model; a model's "fake" object in model_config.json overrides them.
+FAKE_DEFAULTS = {
+    "ttft": float(os.getenv("FAKE_BEDROCK_TTFT", "0.5")),
+    "tokens_per_second": float(os.getenv("FAKE_BEDROCK_TOKENS_PER_SECOND", "40")),
+    "jitter": float(os.getenv("FAKE_BEDROCK_JITTER", "0.2")),
+    "max_tokens": int(os.getenv("FAKE_BEDROCK_MAX_TOKENS", "120")),
+    "error_rate": float(os.getenv("FAKE_BEDROCK_ERROR_RATE", "0")),
+    "throttle_rate": float(os.getenv("FAKE_BEDROCK_THROTTLE_RATE", "0")),
+}
+
+_FILLER = (
+    "This is a simulated response from the offline Bedrock stand-in. It streams "
+    "words at a configurable pace so the arena can be exercised without network "
+    "access, credentials or model quota."
+).split()
+
+
+def _client_error(code, message):
+    return ClientError({"Error": {"Code": code, "Message": message}}, "ConverseStream")
+
+
+class FakeChatBedrock:
+    """Offline stand-in for ChatBedrockConverse.
+
+    `stream` is a blocking generator of Converse-shaped AIMessageChunks (content is a
+    list of {"type": "text", ...} blocks), paced by a time to first token, a token
+    rate and relative jitter. `throttle_rate` raises ThrottlingException before the
+    first token and `error_rate` raises ModelStreamErrorException part-way through,
+    each with the given probability per request.
+    """
+
+    def __init__(self, model_id, temperature=None, seed=None, **options):
+        self.model_id = model_id
+        self.temperature = temperature
+        settings = dict(FAKE_DEFAULTS, **options)
+        self.ttft = settings["ttft"]
+        self.tokens_per_second = settings["tokens_per_second"]
+        self.jitter = settings["jitter"]
+        self.max_tokens = settings["max_tokens"]
+        self.error_rate = settings["error_rate"]
+        self.throttle_rate = settings["throttle_rate"]
+        self._random = random.Random(seed)
+
+    def _jittered(self, seconds):
+        return max(0.0, seconds * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+    def _reply_words(self, messages):
+        prompt = messages[-1].content if messages else ""
+        if not isinstance(prompt, str):
+            prompt = str(prompt)
+        words = [f"[{self.model_id}]", "You", "said:"] + prompt.split()[-12:]
+        while len(words) < self.max_tokens:
+            words.extend(_FILLER)
+        return words[:self.max_tokens]
+
+    def stream(self, messages, **kwargs):
+        cancelled = threading.Event()
+        on_stream_cancel(cancelled.set)
+
+        if self._random.random() < self.throttle_rate:
+            raise _client_error("ThrottlingException", "Too many requests (simulated)")
+
+        words = self._reply_words(messages)
+        fail_at = self._random.randrange(1, len(words)) if len(words) > 1 and self._random.random() < self.error_rate else None
+
+        # Waiting on the event (rather than sleeping) lets a cancelled stream stop at once
+        if cancelled.wait(self._jittered(self.ttft)):
+            return
+        for index, word in enumerate(words):
+            if index == fail_at:
+                raise _client_error("ModelStreamErrorException", "Stream interrupted (simulated)")
+            if index and cancelled.wait(self._jittered(1.0 / self.tokens_per_second)):
+                return
+            text = word if index == 0 else f" {word}"
+            yield AIMessageChunk(content=[{"type": "text", "text": text, "index": 0}])
+
+    def invoke(self, messages, **kwargs):
+        text = "".join(
+            block["text"] for chunk in self.stream(messages) for block in chunk.content
+        )
+        return AIMessage(content=text)
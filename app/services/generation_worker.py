@@ -0,0 +1,164 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+
+# Chat turns generated at once per process; further turns wait in the queue.
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "16"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class _BufferSlot:
+    """Stands in for an st.empty() placeholder: keeps the latest body instead of drawing it."""
+
+    def __init__(self, job, name):
+        self._job = job
+        self._name = name
+
+    def markdown(self, body, **kwargs):
+        self._job._write(self._name, body)
+
+
+class GenerationJob:
+    """One chat turn being generated in the background.
+
+    `placeholders` is handed to the generation coroutine in place of Streamlit
+    placeholders; whatever it paints is buffered here so a script run (or the
+    rerun after it) can attach with `wait` and repaint the real ones.
+    """
+
+    def __init__(self, session_id, model_names, start):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.model_names = list(model_names)
+        self.placeholders = {name: _BufferSlot(self, name) for name in self.model_names}
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self._start = start
+        self._texts = {name: "" for name in self.model_names}
+        self._version = 0
+        self._changed = threading.Condition()
+        self._loop = None
+        self._task = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def elapsed(self):
+        return time.monotonic() - self.submitted_at
+
+    def _write(self, name, body):
+        with self._changed:
+            self._texts[name] = body
+            self._version += 1
+            self._changed.notify_all()
+
+    def _set_status(self, status, result=None, error=None):
+        with self._changed:
+            self.status = status
+            self.result = result
+            self.error = error
+            self._version += 1
+            self._changed.notify_all()
+
+    def wait(self, version, timeout):
+        """Block until the buffers move past `version`, the job ends or `timeout` passes.
+
+        Returns (version, texts by model name, finished).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version or self.finished, timeout)
+            return self._version, dict(self._texts), self.finished
+
+    def cancel(self):
+        with self._changed:
+            if self.finished:
+                return
+            loop, task = self._loop, self._task
+        if task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+        else:
+            self._set_status(CANCELLED)
+
+
+class GenerationWorker:
+    """Process-wide event loop thread that owns model streams for every session.
+
+    Jobs are queued and run `GENERATION_CONCURRENCY` at a time, so a Streamlit
+    rerun (a click mid-stream) neither cancels nor blocks a generation.
+    """
+
+    def __init__(self, concurrency=GENERATION_CONCURRENCY):
+        self.concurrency = concurrency
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="generation-worker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        for _ in range(self.concurrency):
+            self._loop.create_task(self._consume())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _consume(self):
+        while True:
+            job = await self._queue.get()
+            # Checked under the same lock cancel() takes, so a job cancelled now never starts
+            with job._changed:
+                if job.finished:
+                    continue
+                task = asyncio.ensure_future(self._run_job(job))
+                job._loop, job._task = self._loop, task
+            await asyncio.gather(task, return_exceptions=True)
+            if not job.finished:
+                # Cancelled before it got to run
+                job._set_status(CANCELLED)
+
+    async def _run_job(self, job):
+        with job._changed:
+            # Already cancelled: don't let RUNNING overwrite that
+            if job.finished:
+                return
+            job._set_status(RUNNING)
+        try:
+            result = await job._start(job.placeholders)
+        except asyncio.CancelledError:
+            job._set_status(CANCELLED)
+            raise
+        except Exception as e:
+            print(f"Error in generation job {job.id}: {e}")
+            job._set_status(FAILED, error=e)
+        else:
+            job._set_status(DONE, result=result)
+
+    def submit(self, session_id, model_names, start):
+        """Queue `start(placeholders)`, a coroutine function, and return its job right away."""
+        job = GenerationJob(session_id, model_names, start)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job)
+        return job
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_generation_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = GenerationWorker()
+        return _worker
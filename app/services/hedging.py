@@ -0,0 +1,125 @@
+import asyncio
+import os
+import threading
+from collections import deque
+
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+
+
+class TTFTTracker:
+    """Recent time-to-first-token samples per model id, shared by all sessions."""
+
+    def __init__(self, window=HEDGE_WINDOW, min_samples=HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, model_id, ttft):
+        if ttft is None:
+            return
+        with self._lock:
+            self._samples.setdefault(model_id, deque(maxlen=self.window)).append(ttft)
+
+    def percentile(self, model_id, fraction=0.95):
+        """Return the given percentile, or None until enough samples have been seen."""
+        with self._lock:
+            samples = sorted(self._samples.get(model_id, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(fraction * len(samples)))
+        return samples[index]
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, model_id, fired=False, won=False):
+        with self._lock:
+            counts = self._counts.setdefault(model_id, {"requests": 0, "fired": 0, "won": 0})
+            counts["requests"] += 1
+            counts["fired"] += int(fired)
+            counts["won"] += int(won)
+
+    def stats(self):
+        with self._lock:
+            return {
+                model_id: dict(
+                    counts,
+                    fire_rate=counts["fired"] / counts["requests"] if counts["requests"] else 0.0,
+                    win_rate=counts["won"] / counts["fired"] if counts["fired"] else 0.0,
+                )
+                for model_id, counts in self._counts.items()
+            }
+
+
+async def _discard(task, gen):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await gen.aclose()
+
+
+async def hedged_stream(start_attempt, delay, on_result=None):
+    """Stream from `start_attempt()`, firing a duplicate if no token arrives within `delay`.
+
+    Whichever attempt yields its first chunk first is kept and the other is cancelled
+    and closed. An attempt that fails before its first chunk only loses if the other
+    is still running. `on_result(fired, hedge_won)` is called once the race is decided.
+    """
+    primary = start_attempt()
+    attempts = {asyncio.ensure_future(primary.__anext__()): primary}
+    fired = False
+    winner = None
+    first_chunk = None
+    error = None
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if not done:
+            fired = True
+            secondary = start_attempt()
+            attempts[asyncio.ensure_future(secondary.__anext__())] = secondary
+
+        while attempts and winner is None:
+            done, _ = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                gen = attempts.pop(task)
+                exc = task.exception()
+                if exc is None or isinstance(exc, StopAsyncIteration):
+                    winner = gen
+                    first_chunk = None if exc else task.result()
+                    break
+                error = exc
+                await gen.aclose()
+    finally:
+        # Cancel the loser, or everything if we are being cancelled ourselves
+        for task, gen in attempts.items():
+            await _discard(task, gen)
+
+    if on_result is not None:
+        on_result(fired, fired and winner is not None and winner is not primary)
+    if winner is None:
+        raise error
+
+    try:
+        if first_chunk is None:
+            return
+        yield first_chunk
+        async for chunk in winner:
+            yield chunk
+    finally:
+        await winner.aclose()
+
+
+_ttft_tracker = TTFTTracker()
+_hedge_stats = HedgeStats()
+
+
+def get_ttft_tracker():
+    return _ttft_tracker
+
+
+def get_hedge_stats():
+    return _hedge_stats
@@ -0,0 +1,240 @@
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Serving port for /metrics; 0 (the default) disables collection entirely.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+ENABLED = METRICS_PORT > 0
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_collector(self, collector):
+        """`collector()` returns [(name, labels_dict, value), ...] gauges, read at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            collectors = list(self._collectors)
+
+        declared = set()
+        for (name, labels), histogram in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, {'le': bound})} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        gauges = []
+        for collector in collectors:
+            try:
+                gauges.extend(collector())
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        # Samples of one metric must be contiguous in the exposition format
+        gauges.sort(key=lambda gauge: gauge[0])
+        for name, labels, value in gauges:
+            if name not in declared:
+                lines.append(f"# TYPE {name} gauge")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(sorted(labels.items()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _service_gauges():
+    # Imported at scrape time; these modules themselves import metrics
+    from app.services.aws_clients import get_client_registry
+    from app.services.hedging import get_hedge_stats
+    from app.services.response_cache import get_response_cache
+    from app.services.retry import limiter_stats
+    from app.services.singleflight import get_singleflight
+
+    gauges = []
+    for kind, counts in get_client_registry().stats().items():
+        gauges.append(("arena_aws_client_cache_hits", {"kind": kind}, counts["hits"]))
+        gauges.append(("arena_aws_client_cache_misses", {"kind": kind}, counts["misses"]))
+    cache = get_response_cache().stats()
+    for field in ("hits", "misses", "entries", "bytes"):
+        gauges.append((f"arena_response_cache_{field}", {}, cache[field]))
+    for model_id, limiter in limiter_stats().items():
+        gauges.append(("arena_model_concurrency_limit", {"model": model_id}, limiter["limit"]))
+        gauges.append(("arena_model_in_flight", {"model": model_id}, limiter["in_flight"]))
+    for model_id, hedges in get_hedge_stats().stats().items():
+        for field in ("requests", "fired", "won"):
+            gauges.append((f"arena_hedge_{field}", {"model": model_id}, hedges[field]))
+    flights = get_singleflight().stats()
+    gauges.append(("arena_singleflight_leaders", {}, flights["leaders"]))
+    gauges.append(("arena_singleflight_followers", {}, flights["followers"]))
+    return gauges
+
+
+_registry = MetricsRegistry()
+_registry.register_collector(_service_gauges)
+
+
+def get_metrics_registry():
+    return _registry
+
+
+class _Span:
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _registry.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **labels):
+    """Time a block into the `name` histogram. A shared no-op when metrics are disabled."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name, labels)
+
+
+def timed(name, **labels):
+    """Decorator form of `span`; returns the function unchanged when metrics are disabled."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(name, labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe(name, value, **labels):
+    if ENABLED and value is not None:
+        _registry.observe(name, value, **labels)
+
+
+def inc(name, value=1, **labels):
+    if ENABLED:
+        _registry.inc(name, value, **labels)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread next to the Streamlit server. Safe to call every rerun."""
+    global _server
+    if not ENABLED or _server is not None:
+        return _server
+    with _server_lock:
+        if _server is None:
+            try:
+                server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics endpoint not started on port {port}: {e}")
+                return None
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+            _server = server
+    return _server
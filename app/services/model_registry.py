@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+
+DEFAULT_CONFIG_PATH = os.getenv(
+    "MODEL_CONFIG_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "config", "model_config.json"),
+)
+
+REQUIRED_FIELDS = {"id": str, "key": str, "provider": str}
+OPTIONAL_FIELDS = {
+    "context_tokens": int,
+    "response_cache": bool,
+    "ttft_timeout": (int, float),
+    "total_timeout": (int, float),
+    "backend": str,
+    "fake": dict,
+}
+BACKENDS = ("bedrock", "fake")
+
+
+class ModelConfigError(ValueError):
+    pass
+
+
+def validate_model_config(config):
+    if not isinstance(config, dict) or not config:
+        raise ModelConfigError("Model config must be a non-empty JSON object of model name -> settings")
+
+    seen_keys = set()
+    for name, info in config.items():
+        if not isinstance(info, dict):
+            raise ModelConfigError(f"Model '{name}' must map to an object")
+        for field, field_type in REQUIRED_FIELDS.items():
+            if not isinstance(info.get(field), field_type) or not info[field]:
+                raise ModelConfigError(f"Model '{name}' is missing required field '{field}'")
+        for field, field_type in OPTIONAL_FIELDS.items():
+            if field in info and not isinstance(info[field], field_type):
+                raise ModelConfigError(f"Model '{name}' field '{field}' has the wrong type")
+        if info.get("backend", "bedrock") not in BACKENDS:
+            raise ModelConfigError(f"Model '{name}' has unknown backend '{info['backend']}'")
+        if info["key"] in seen_keys:
+            raise ModelConfigError(f"Duplicate model key '{info['key']}'")
+        seen_keys.add(info["key"])
+    return config
+
+
+class ModelRegistry:
+    """Loads model_config.json once and reloads it when the file's mtime changes."""
+
+    def __init__(self, path=DEFAULT_CONFIG_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._models = None
+        self._mtime = None
+        self._last_check = 0.0
+        self.reload()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Model config file not found at {self.path}")
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, "r") as f:
+            return mtime, validate_model_config(json.load(f))
+
+    def reload(self):
+        with self._lock:
+            self._mtime, self._models = self._read()
+            self._last_check = time.monotonic()
+
+    def _refresh_if_changed(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            try:
+                if os.path.getmtime(self.path) == self._mtime:
+                    return
+                self._mtime, self._models = self._read()
+                print(f"Reloaded model config from {self.path}")
+            except (OSError, ValueError) as e:
+                # Keep serving the last good config while the file is being edited.
+                print(f"Ignoring invalid model config update: {e}")
+
+    def models(self):
+        self._refresh_if_changed()
+        return self._models
+
+    def names(self):
+        return list(self.models().keys())
+
+    def get(self, name):
+        return self.models()[name]
+
+    def find_by_id(self, model_id):
+        for info in self.models().values():
+            if info["id"] == model_id:
+                return info
+        return None
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_model_registry(path=None):
+    path = path or DEFAULT_CONFIG_PATH
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = ModelRegistry(path)
+        return _registries[path]
@@ -1,21 +1,53 @@
-import json, os
-import boto3
+import os
+import time
 import asyncio
-from langchain_aws import ChatBedrockConverse
+import functools
 from langchain_core.messages import HumanMessage, AIMessage
+from app.services.stream_executor import iterate_in_thread
+from app.services.aws_clients import get_client, get_chat_model
+from app.services.model_registry import get_model_registry
+from app.services.context_window import get_context_window
+from app.services.summarizer import compact_history
+from app.services.response_cache import get_response_cache, request_key
+from app.services.semantic_cache import get_semantic_cache
+from app.services.stream_renderer import StreamRenderer
+from app.services.stream_multiplexer import StreamMultiplexer, StreamTimeout
+from app.services.hedging import get_hedge_stats, get_ttft_tracker, hedged_stream
+from app.services.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from app.services.retry import MAX_RETRIES, backoff_delay, error_code, get_concurrency_limiter, is_retryable, is_throttling
+from app.services.singleflight import SINGLEFLIGHT_ENABLED, get_singleflight
+from app.services import metrics
+
+# Used for models whose config does not set ttft_timeout / total_timeout (seconds)
+DEFAULT_TTFT_TIMEOUT = float(os.getenv("MODEL_TTFT_TIMEOUT", "30"))
+DEFAULT_TOTAL_TIMEOUT = float(os.getenv("MODEL_TOTAL_TIMEOUT", "300"))
+HEDGE_SINGLE_MODEL = os.getenv("MODEL_HEDGING", "false").lower() in ("1", "true", "yes")
 
 class ModelStreamer:
-    def __init__(self, config_path="config/model_config.json", region="us-east-1"):
-        self.bedrock = boto3.client(service_name="bedrock-runtime", region_name=region)
+    def __init__(self, registry=None, region="us-east-1", render_fps=None, hedge_single_model=HEDGE_SINGLE_MODEL,
+                 singleflight=SINGLEFLIGHT_ENABLED):
+        self.bedrock = get_client("bedrock-runtime", region)
         self.region = region
-        self.model_map = self.load_model_config(config_path)
-
-    def load_model_config(self, path):
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Model config file not found at {path}")
-        with open(path, "r") as f:
-            return json.load(f)
-        
+        self.registry = registry or get_model_registry()
+        self.context_window = get_context_window()
+        self.response_cache = get_response_cache()
+        self.semantic_cache = get_semantic_cache()
+        self.failed_models = set()
+        self.render_fps = render_fps
+        self.last_stream_metrics = {}
+        self.last_turn_stats = {}
+        self.hedge_single_model = hedge_single_model
+        self.ttft_tracker = get_ttft_tracker()
+        self.hedge_stats = get_hedge_stats()
+        self.last_dropped_turns = {}
+        self.singleflight = get_singleflight() if singleflight else None
+        self.last_coalesced = set()
+
+    @property
+    def model_map(self):
+        return self.registry.models()
+
+    @metrics.timed("arena_history_build_seconds", path="full")
     def get_history_per_model(self, chat_history, selected_model_keys):
         model_histories = {key: [] for key in selected_model_keys}
         system_prompt_content = None
@@ -48,6 +80,7 @@ class ModelStreamer:
             for key in selected_model_keys
         }
 
+    @metrics.timed("arena_titan_messages_seconds")
     def build_messages_for_titan(self, system_content, chat_history):
         """Build messages for Titan models (no system message support)"""
         try:
@@ -78,27 +111,131 @@ class ModelStreamer:
             print(f"Error building messages for Titan: {e}")
             return chat_history or []
 
-    async def invoke_model_streaming(self, model_id, messages, temperature):
+    def create_llm(self, model_id, temperature):
+        info = self.registry.find_by_id(model_id) or {}
+        return get_chat_model(
+            model_id,
+            self.region,
+            temperature,
+            backend=info.get("backend"),
+            backend_options=info.get("fake")
+        )
+
+    @staticmethod
+    def extract_text(chunk):
+        text = ""
+        if hasattr(chunk, 'content') and chunk.content:
+            for content_item in chunk.content:
+                if isinstance(content_item, dict) and content_item.get('type') == 'text':
+                    text += content_item.get('text', '')
+        return text
+
+    @staticmethod
+    def is_first_turn(chat_history):
+        return (
+            bool(chat_history)
+            and chat_history[-1].get("role") == "user"
+            and all(chat_history[i].get("role") == "system" for i in range(len(chat_history) - 1))
+        )
+
+    def hedged_invoke(self, model_id, messages, temperature, cache_key=None):
+        """Stream one model, racing a duplicate request once its observed p95 TTFT has passed."""
+        delay = self.ttft_tracker.percentile(model_id, 0.95)
+        if delay is None:
+            # Not enough history yet to know what "slow" means for this model
+            self.hedge_stats.record(model_id)
+            return self.invoke_model_streaming(model_id, messages, temperature, cache_key)
+        return hedged_stream(
+            lambda: self.invoke_model_streaming(model_id, messages, temperature, cache_key),
+            delay,
+            on_result=lambda fired, won: self.hedge_stats.record(model_id, fired, won)
+        )
+
+    @staticmethod
+    def partial_marker(error):
+        if isinstance(error, StreamTimeout):
+            reason = "no response started" if error.kind == "ttft" else "the response took too long"
+            return f"\n\n⚠️ _Response incomplete: {reason} (limit {error.seconds:g}s)._"
+        if isinstance(error, CircuitOpenError):
+            return "⚠️ _Model temporarily unavailable after repeated errors; skipped for this turn._"
+        code = error_code(error)
+        detail = f" ({code})" if code else ""
+        return f"\n\n⚠️ _Response incomplete: the model returned an error{detail}._"
+
+    async def replay_cached(self, chunks):
+        for chunk in chunks:
+            yield chunk
+            # Let the other models' streams interleave with the replay
+            await asyncio.sleep(0)
+
+    async def invoke_model_streaming(self, model_id, messages, temperature, cache_key=None):
+        """Stream one model's reply, retrying retryable errors that happen before the first token.
+
+        Concurrency per model id is capped by a process-wide AIMD limiter that
+        shrinks on throttling, and a per-model circuit breaker fast-fails models
+        that keep failing. Errors that cannot be retried are re-raised.
+        """
+        breaker = get_circuit_breaker(model_id)
+        if not breaker.allow_request():
+            raise CircuitOpenError(model_id, breaker.retry_after())
+
+        settled = False
         try:
-            llm = ChatBedrockConverse(
-                model_id=model_id,
-                region_name=self.region,
-                temperature=temperature
-            )
+            limiter = get_concurrency_limiter(model_id)
+            llm = self.create_llm(model_id, temperature)
+            attempt = 0
 
-            print(f"➡ Invoking Titan model {model_id} with {len(messages)} messages")
-            
-            for chunk in llm.stream(messages):
-                if hasattr(chunk, 'content') and chunk.content:
-                    for content_item in chunk.content:
-                        if isinstance(content_item, dict) and content_item.get('type') == 'text':
-                            text = content_item.get('text', '')
+            while True:
+                await limiter.acquire()
+                outcome = "error"
+                received = []
+                retry_in = None
+                try:
+                    print(f"➡ Invoking Titan model {model_id} with {len(messages)} messages")
+
+                    # The Bedrock stream is blocking; read it on a worker thread so the
+                    # other models keep streaming while this one waits on the network.
+                    chunks = iterate_in_thread(lambda: llm.stream(messages))
+                    try:
+                        async for chunk in chunks:
+                            text = self.extract_text(chunk)
                             if text:
+                                received.append(text)
                                 yield text
-        except Exception as e:
-            print(f"Error invoking model {model_id}: {e}")
-            import traceback
-            traceback.print_exc()
+                    finally:
+                        await chunks.aclose()
+                    outcome = "success"
+                except Exception as e:
+                    if is_throttling(e):
+                        outcome = "throttled"
+                    # Once text has been shown, a retry would duplicate it
+                    if received or not is_retryable(e) or attempt >= MAX_RETRIES:
+                        self.failed_models.add(model_id)
+                        print(f"Error invoking model {model_id}: {e}")
+                        raise
+                    attempt += 1
+                    retry_in = backoff_delay(attempt)
+                    print(f"Retrying {model_id} in {retry_in:.2f}s after {error_code(e) or type(e).__name__} (attempt {attempt})")
+                finally:
+                    limiter.release(outcome)
+
+                if retry_in is None:
+                    break
+                await asyncio.sleep(retry_in)
+
+            breaker.record_success()
+            settled = True
+        except Exception:
+            breaker.record_failure()
+            settled = True
+            raise
+        finally:
+            if not settled:
+                breaker.record_abandoned()
+
+        # Only complete responses are cached
+        if cache_key is not None:
+            self.response_cache.put(cache_key, received)
 
     async def stream_models(
         self,
@@ -106,47 +243,167 @@ class ModelStreamer:
         system_prompt,
         chat_history,
         temperature,
-        placeholders
+        placeholders,
+        conversation_cache=None,
+        summary=None
     ):
-        selected_model_keys = [self.model_map[name]["key"] for name in selected_models]
-        history_by_model = self.get_history_per_model(chat_history, selected_model_keys)
+        turn_started = time.monotonic()
+        model_map = self.model_map
+        selected_model_keys = [model_map[name]["key"] for name in selected_models]
+        if conversation_cache is not None:
+            # Only the turns added since the last send are converted
+            with metrics.span("arena_history_build_seconds", path="cache"):
+                history_by_model = conversation_cache.histories(
+                    chat_history, selected_model_keys, self.build_messages_for_titan
+                )
+        else:
+            history_by_model = self.get_history_per_model(chat_history, selected_model_keys)
+
+        # Near-duplicate first questions are answered from the semantic cache
+        first_prompt = None
+        semantic_hits = {}
+        if self.semantic_cache.enabled and self.is_first_turn(chat_history):
+            first_prompt = chat_history[-1].get("content", "")
+            semantic_hits = self.semantic_cache.lookup(first_prompt, system_prompt, selected_model_keys)
 
         active_gens = {}
+        live_models = {}
+        self.last_dropped_turns = {}
+        self.last_coalesced = set()
+        self.failed_models = set()
         for model_name in selected_models:
-            model_info = self.model_map[model_name]
+            model_info = model_map[model_name]
             key = model_info["key"]
             model_id = model_info["id"]
+
+            if key in semantic_hits:
+                print(f'➡ Serving {model_name} from the semantic cache')
+                active_gens[model_name] = self.replay_cached([semantic_hits[key]])
+                self.last_dropped_turns[model_name] = 0
+                continue
+
             history = history_by_model[key]["messages"]
             system_content = history_by_model[key]["system_content"] or system_prompt
             
             print(f'➡ Processing {model_name} (ID: {model_id}) with history length: {len(history)}')
             
-            # Build messages without system message support
-            messages = self.build_messages_for_titan(system_content, history)
+            prompt = history_by_model[key].get("prompt")
+
+            # Fold turns already covered by the running summary into the system content
+            if summary:
+                turn_starts = history_by_model[key].get("turn_starts")
+                if turn_starts is None:
+                    turn_starts = [i for i, msg in enumerate(history) if isinstance(msg, HumanMessage)]
+                compacted_system, compacted_history = compact_history(summary, system_content, history, turn_starts)
+                if compacted_history is not history:
+                    system_content, history, prompt = compacted_system, compacted_history, None
+
+            # Build messages without system message support, keeping the newest
+            # turns that fit the model's context budget
+            messages, dropped = self.context_window.fit(
+                system_content,
+                history,
+                model_info.get("context_tokens"),
+                self.build_messages_for_titan,
+                prompt=prompt
+            )
+            self.last_dropped_turns[model_name] = dropped
+            if dropped:
+                print(f'➡ Dropped {dropped} oldest turns for {model_name} to fit its context budget')
             
-            gen = self.invoke_model_streaming(model_id, messages, temperature)
-            active_gens[model_name] = gen
+            # Deterministic requests are served from the response cache when possible
+            cache_key = None
+            if temperature == 0 and model_info.get("response_cache", True):
+                cache_key = request_key(model_id, messages, {"temperature": temperature})
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    print(f'➡ Serving {model_name} from the response cache')
+                    active_gens[model_name] = self.replay_cached(cached)
+                    continue
 
-        responses = {model_name: "" for model_name in selected_models}
-        tasks = {
-            model_name: asyncio.create_task(gen.__anext__())
-            for model_name, gen in active_gens.items()
+            live_models[model_name] = model_id
+            if self.hedge_single_model and len(selected_models) == 1:
+                start = functools.partial(self.hedged_invoke, model_id, messages, temperature, cache_key)
+            else:
+                start = functools.partial(self.invoke_model_streaming, model_id, messages, temperature, cache_key)
+
+            # Identical requests already in flight (e.g. a workshop's shared starter
+            # prompt) are followed instead of opening another Bedrock stream
+            if self.singleflight is not None:
+                flight_key = cache_key or request_key(model_id, messages, {"temperature": temperature})
+                active_gens[model_name] = self.singleflight.stream(
+                    flight_key, start, on_follow=functools.partial(self.last_coalesced.add, model_name)
+                )
+            else:
+                active_gens[model_name] = start()
+
+        if self.render_fps is None:
+            renderer = StreamRenderer(placeholders)
+        else:
+            renderer = StreamRenderer(placeholders, max_fps=self.render_fps)
+
+        deadlines = {
+            model_name: (
+                model_map[model_name].get("ttft_timeout", DEFAULT_TTFT_TIMEOUT),
+                model_map[model_name].get("total_timeout", DEFAULT_TOTAL_TIMEOUT)
+            )
+            for model_name in active_gens
         }
+        multiplexer = StreamMultiplexer(active_gens, deadlines=deadlines)
+        try:
+            async for event in multiplexer.events(heartbeat=renderer.interval or None):
+                if event.error is not None:
+                    # Keep what arrived and mark it, so the other columns are still shown and saved
+                    print(f"Error with {event.source}: {event.error}")
+                    self.failed_models.add(model_map[event.source]["id"])
+                    issued = multiplexer.metrics[event.source].issued_at is not None
+                    if isinstance(event.error, StreamTimeout) and issued:
+                        # A hung model counts against its breaker like any other failure,
+                        # but not time spent queued before the request was sent
+                        get_circuit_breaker(model_map[event.source]["id"]).record_failure()
+                    renderer.append(event.source, self.partial_marker(event.error))
+                    renderer.finish(event.source)
+                elif event.done:
+                    renderer.finish(event.source)
+                elif event.source is not None:
+                    renderer.append(event.source, event.chunk)
+                renderer.flush_due()
+        finally:
+            await multiplexer.aclose()
+            self.last_stream_metrics = multiplexer.metrics_report()
+            for model_name, model_id in live_models.items():
+                stream_metrics = self.last_stream_metrics[model_name]
+                if model_name in self.last_coalesced:
+                    # A follower's TTFT says nothing about the model's own latency
+                    metrics.inc("arena_model_coalesced_total", model=model_id)
+                    continue
+                self.ttft_tracker.record(model_id, stream_metrics["ttft"])
+                metrics.observe("arena_model_ttft_seconds", stream_metrics["ttft"], model=model_id)
+                metrics.observe("arena_model_stream_seconds", stream_metrics["total"], model=model_id)
+                metrics.inc("arena_model_tokens_total", stream_metrics["tokens"], model=model_id)
+                if stream_metrics["error"]:
+                    metrics.inc("arena_model_stream_errors_total", model=model_id)
 
-        while tasks:
-            done, _ = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_COMPLETED)
-            for task in done:
-                model_name = next(name for name, tsk in tasks.items() if tsk == task)
-                try:
-                    chunk = await task
-                    responses[model_name] += chunk
-                    placeholders[model_name].markdown(responses[model_name] + "▌")
-                    tasks[model_name] = asyncio.create_task(active_gens[model_name].__anext__())
-                except StopAsyncIteration:
-                    placeholders[model_name].markdown(responses[model_name])
-                    del tasks[model_name]
-                except Exception as e:
-                    print(f"Error with {model_name}: {e}")
-                    del tasks[model_name]
+        responses = {model_name: renderer.text(model_name) for model_name in selected_models}
+        # Timings are measured from the start of the turn, history assembly included
+        self.last_turn_stats = dict(
+            renderer.stats(),
+            first_paint=None if renderer.first_render_at is None else renderer.first_render_at - turn_started,
+            total=time.monotonic() - turn_started,
+            models=self.last_stream_metrics
+        )
+
+        if first_prompt is not None:
+            fresh = {
+                model_map[name]["key"]: responses[name]
+                for name in selected_models
+                if responses[name]
+                and model_map[name]["key"] not in semantic_hits
+                and model_map[name]["id"] not in self.failed_models
+            }
+            # Embedding and journaling the entry is file I/O; keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.semantic_cache.put, first_prompt, system_prompt, fresh
+            )
 
         return responses
@@ -0,0 +1,103 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# Comma-separated user ids (Cognito usernames / emails) allowed to profile reruns
+ADMIN_USERS = {user.strip().lower() for user in os.getenv("ADMIN_USERS", "").split(",") if user.strip()}
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", "5"))
+
+PHASES = ("session_init", "auth_ui", "sidebar", "transcript", "model_streaming")
+
+# Streamlit runs each rerun on its own script thread
+_active = threading.local()
+
+
+def is_admin(user_id):
+    return bool(user_id) and user_id.lower() in ADMIN_USERS
+
+
+class RerunProfiler:
+    """Wall-clock time per rerun phase, plus a cProfile of the script thread when one can be taken."""
+
+    def __init__(self, use_cprofile=True, clock=time.perf_counter):
+        self.use_cprofile = use_cprofile
+        self.clock = clock
+        self.phases = {}
+        self.profile = None
+        self.started_at = None
+
+    def start(self):
+        self.started_at = self.clock()
+        _active.profiler = self
+        if self.use_cprofile:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self.profile = profile
+            except ValueError:
+                # Python 3.12+ allows one cProfile per process; another rerun holds it
+                self.profile = None
+
+    @contextmanager
+    def phase(self, name):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + self.clock() - started
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+        if getattr(_active, "profiler", None) is self:
+            _active.profiler = None
+
+        record = {
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "total": self.clock() - self.started_at,
+            "phases": dict(self.phases),
+            "profile": None,
+            "top": "",
+        }
+        if self.profile is not None:
+            self.profile.create_stats()
+            # Same bytes as Profile.dump_stats, so pstats / snakeviz can open the download
+            record["profile"] = marshal.dumps(self.profile.stats)
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(15)
+            record["top"] = out.getvalue()
+        return record
+
+
+def phase(name):
+    """Time a block against the rerun being profiled on this thread, if any."""
+    profiler = getattr(_active, "profiler", None)
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name)
+
+
+@contextmanager
+def profile_rerun(session_state):
+    """Profile the enclosed rerun when an admin has switched profiling on.
+
+    The record is written in a finally block because st.rerun() and st.stop() end
+    a rerun by raising RerunException / StopException through app.main.
+    """
+    if not (session_state.get("profile_reruns") and is_admin(session_state.get("user_id"))):
+        yield None
+        return
+
+    profiler = RerunProfiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        history = session_state.get("rerun_profiles", [])
+        session_state["rerun_profiles"] = (history + [profiler.stop()])[-PROFILE_HISTORY:]
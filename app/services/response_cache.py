@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+
+def request_key(model_id, messages, params):
+    """Stable hash of a model request: model id, generation params and the exact message list."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([model_id, params], sort_keys=True).encode("utf-8"))
+    for message in messages:
+        digest.update(b"\x00")
+        digest.update(getattr(message, "type", type(message).__name__).encode("utf-8"))
+        digest.update(b"\x00")
+        content = message.content
+        digest.update((content if isinstance(content, str) else json.dumps(content, sort_keys=True)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache of streamed responses, bounded in bytes.
+
+    Entries keep the original chunks so a hit replays through the same streaming
+    path as a live response.
+    """
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, chunks, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return chunks
+
+    def put(self, key, chunks):
+        chunks = tuple(chunks)
+        size = sum(len(chunk.encode("utf-8")) for chunk in chunks)
+        if not chunks or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, chunks, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                hit_rate=self._stats["hits"] / lookups if lookups else 0.0,
+            )
+
+
+_response_cache = ResponseCache()
+
+
+def get_response_cache():
+    return _response_cache
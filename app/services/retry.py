@@ -0,0 +1,102 @@
+import asyncio
+import os
+import random
+import threading
+from botocore.exceptions import ClientError, ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+
+MAX_RETRIES = int(os.getenv("BEDROCK_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("BEDROCK_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("BEDROCK_RETRY_MAX_DELAY", "8"))
+
+AIMD_INITIAL_LIMIT = float(os.getenv("BEDROCK_AIMD_INITIAL_LIMIT", "8"))
+AIMD_MIN_LIMIT = float(os.getenv("BEDROCK_AIMD_MIN_LIMIT", "1"))
+AIMD_MAX_LIMIT = float(os.getenv("BEDROCK_AIMD_MAX_LIMIT", "64"))
+
+THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+TRANSIENT_CODES = {"ServiceUnavailableException", "InternalServerException", "ModelNotReadyException", "ModelTimeoutException"}
+TRANSIENT_ERRORS = (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)
+
+
+def error_code(error):
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code")
+    return None
+
+
+def is_throttling(error):
+    return error_code(error) in THROTTLING_CODES
+
+
+def is_retryable(error):
+    return is_throttling(error) or error_code(error) in TRANSIENT_CODES or isinstance(error, TRANSIENT_ERRORS)
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Full-jitter exponential backoff for the given retry attempt (1-based)."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease cap on concurrent streams for one model.
+
+    Shared by every session in the process, across threads and event loops, so a
+    throttling storm shrinks everyone's concurrency at once instead of each user
+    retrying into the same quota.
+    """
+
+    def __init__(self, initial=AIMD_INITIAL_LIMIT, min_limit=AIMD_MIN_LIMIT, max_limit=AIMD_MAX_LIMIT,
+                 decrease_factor=0.5):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waited": 0, "throttled": 0}
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight < max(1, int(self.limit)):
+                self.in_flight += 1
+                self._stats["acquired"] += 1
+                return True
+            return False
+
+    async def acquire(self, poll_interval=0.05):
+        if self.try_acquire():
+            return
+        with self._lock:
+            self._stats["waited"] += 1
+        while not self.try_acquire():
+            await asyncio.sleep(poll_interval * random.uniform(0.5, 1.5))
+
+    def release(self, outcome="success"):
+        """Free a slot; `outcome` is "success", "throttled" or "error"."""
+        with self._lock:
+            self.in_flight -= 1
+            if outcome == "throttled":
+                self._stats["throttled"] += 1
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            elif outcome == "success":
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, limit=self.limit, in_flight=self.in_flight)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(model_id):
+    with _limiters_lock:
+        if model_id not in _limiters:
+            _limiters[model_id] = AIMDLimiter()
+        return _limiters[model_id]
+
+
+def limiter_stats():
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {model_id: limiter.stats() for model_id, limiter in limiters.items()}
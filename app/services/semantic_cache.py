@@ -0,0 +1,211 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+import numpy as np
+
+# Directory for the memory-mapped index; the cache is disabled when unset.
+SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", "")
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY", "5000"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+EMBEDDING_DIM = 1024
+
+
+def embed(text, dim=EMBEDDING_DIM):
+    """Hashed character-trigram and word vector, L2-normalised. Cheap, local and deterministic."""
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+    padded = f" {normalized} "
+    features = [padded[i:i + 3] for i in range(len(padded) - 2)] + normalized.split()
+
+    vec = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vec
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+    np.add.at(vec, (hashes % dim).astype(np.intp), signs)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def scope_id(text):
+    return zlib.crc32((text or "").encode("utf-8"))
+
+
+class SemanticCache:
+    """Near-duplicate cache for first-turn prompts, persisted to a memory-mapped index.
+
+    Vectors live in `vectors.f32` (capacity x dim float32, memory-mapped) and the
+    per-slot prompt, scope and per-model responses in `entries.jsonl`, an append-only
+    journal with one line per `put` that is compacted once mostly superseded. Lookups
+    are a single matrix-vector product over the occupied slots; when full, the least
+    recently used slot is overwritten.
+    """
+
+    def __init__(self, directory=SEMANTIC_CACHE_DIR, capacity=SEMANTIC_CACHE_CAPACITY,
+                 threshold=SEMANTIC_CACHE_THRESHOLD, dim=EMBEDDING_DIM):
+        self.directory = directory
+        self.capacity = capacity
+        self.threshold = threshold
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._vectors = None
+        if directory:
+            self._open()
+
+    @property
+    def enabled(self):
+        return self._vectors is not None
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._journal_path = os.path.join(self.directory, "entries.jsonl")
+
+        entries = {}
+        if os.path.exists(self._journal_path):
+            try:
+                entries = self._replay()
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Discarding unreadable semantic cache index: {e}")
+
+        expected_size = self.capacity * self.dim * 4
+        reusable = entries and os.path.exists(vectors_path) and os.path.getsize(vectors_path) == expected_size
+        mode = "r+" if reusable else "w+"
+        if mode == "w+":
+            entries = {}
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+
+        self._entries = entries
+        self._occupied = np.zeros(self.capacity, dtype=bool)
+        self._scopes = np.zeros(self.capacity, dtype=np.uint32)
+        self._last_used = np.zeros(self.capacity, dtype=np.float64)
+        for slot, entry in entries.items():
+            self._occupied[slot] = True
+            self._scopes[slot] = entry["scope"]
+            self._last_used[slot] = entry["last_used"]
+        # Start each process from a clean journal (this also drops a torn last line)
+        self._compact()
+
+    def _replay(self):
+        """Rebuild the slot entries from the journal; a torn last line is ignored."""
+        entries = {}
+        with open(self._journal_path, "r") as f:
+            header = json.loads(f.readline())
+            if header.get("dim") != self.dim or header.get("capacity") != self.capacity:
+                return {}
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                slot = record.pop("slot")
+                if record.pop("new") or slot not in entries:
+                    entries[slot] = record
+                else:
+                    entries[slot]["responses"].update(record["responses"])
+                    entries[slot]["last_used"] = record["last_used"]
+        return entries
+
+    def _compact(self):
+        """Rewrite the journal as one line per occupied slot."""
+        self._vectors.flush()
+        tmp_path = self._journal_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"dim": self.dim, "capacity": self.capacity}) + "\n")
+            for slot, entry in self._entries.items():
+                record = dict(entry, slot=slot, new=True, last_used=float(self._last_used[slot]))
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, self._journal_path)
+        self._journal_lines = len(self._entries)
+
+    def _append(self, slot, new, responses):
+        """Journal one put; the whole index is only rewritten when most lines are stale."""
+        if self._journal_lines >= 2 * len(self._entries) + 64:
+            self._compact()
+            return
+        # The vector must be on disk before a line that refers to it
+        self._vectors.flush()
+        entry = self._entries[slot]
+        record = {
+            "slot": slot, "new": new, "prompt": entry["prompt"], "scope": entry["scope"],
+            "responses": entry["responses"] if new else responses, "last_used": float(self._last_used[slot]),
+        }
+        with open(self._journal_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        self._journal_lines += 1
+
+    def _best_match(self, vector, scope):
+        candidates = np.flatnonzero(self._occupied & (self._scopes == scope))
+        if not len(candidates):
+            return None, 0.0
+        similarities = self._vectors[candidates] @ vector
+        best = int(np.argmax(similarities))
+        return int(candidates[best]), float(similarities[best])
+
+    def lookup(self, prompt, scope_text, model_keys):
+        """Return {model_key: response} cached for a similar prompt, or {} on a miss."""
+        if not self.enabled:
+            return {}
+        vector = embed(prompt, self.dim)
+        scope = scope_id(scope_text)
+        with self._lock:
+            slot, similarity = self._best_match(vector, scope)
+            if slot is None or similarity < self.threshold:
+                self._stats["misses"] += 1
+                return {}
+            responses = self._entries[slot]["responses"]
+            hits = {key: responses[key] for key in model_keys if key in responses}
+            if not hits:
+                self._stats["misses"] += 1
+                return {}
+            self._stats["hits"] += 1
+            self._last_used[slot] = time.time()
+            return hits
+
+    def put(self, prompt, scope_text, responses):
+        if not self.enabled or not responses:
+            return
+        vector = embed(prompt, self.dim)
+        scope = scope_id(scope_text)
+        with self._lock:
+            slot, similarity = self._best_match(vector, scope)
+            new = slot is None or similarity < self.threshold
+            if new:
+                free = np.flatnonzero(~self._occupied)
+                if len(free):
+                    slot = int(free[0])
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self._stats["evictions"] += 1
+                self._vectors[slot] = vector
+                self._occupied[slot] = True
+                self._scopes[slot] = scope
+                self._entries[slot] = {"prompt": prompt, "scope": scope, "responses": {}, "last_used": 0.0}
+            self._entries[slot]["responses"].update(responses)
+            self._last_used[slot] = time.time()
+            self._append(slot, new, responses)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(
+                self._stats,
+                entries=int(self._occupied.sum()) if self.enabled else 0,
+                hit_rate=self._stats["hits"] / lookups if lookups else 0.0,
+            )
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache()
+    return _semantic_cache
@@ -0,0 +1,85 @@
+from decimal import Decimal
+
+# Session metadata fields that boto3 cannot store as Python floats
+SESSION_FLOAT_FIELDS = ("temperature",)
+# Numeric fields DynamoDB hands back as Decimal, by the type the app expects
+SESSION_NUMBER_FIELDS = {"temperature": float, "message_count": int, "turn_count": int}
+# Message fields whose values are plain strings and never need converting
+MESSAGE_TEXT_FIELDS = ("role", "content", "responses")
+
+
+def _to_dynamo(value):
+    """Generic fallback for fields outside the known schema."""
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    if isinstance(value, dict):
+        return {k: _to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_dynamo(v) for v in value]
+    return value
+
+
+def _from_dynamo(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: _from_dynamo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_dynamo(v) for v in value]
+    return value
+
+
+def _is_plain(value):
+    return value is None or isinstance(value, (str, int, bool))
+
+
+def serialize_message(message):
+    """Return a message DynamoDB can store, without copying it when nothing needs converting.
+
+    Known fields (text, per-model responses, dropped-turn counts) only hold strings and
+    ints, so the usual message is returned as is; only unexpected fields are converted.
+    """
+    converted = None
+    for key, value in message.items():
+        if key in MESSAGE_TEXT_FIELDS or _is_plain(value):
+            continue
+        if key == "dropped_turns" and all(_is_plain(count) for count in value.values()):
+            continue
+        if converted is None:
+            converted = dict(message)
+        converted[key] = _to_dynamo(value)
+    return message if converted is None else converted
+
+
+def deserialize_message(message):
+    counts = message.get("dropped_turns")
+    if counts:
+        message["dropped_turns"] = {key: int(count) for key, count in counts.items()}
+    for key, value in message.items():
+        if key not in MESSAGE_TEXT_FIELDS and key != "dropped_turns" and not _is_plain(value):
+            message[key] = _from_dynamo(value)
+    return message
+
+
+def serialize_session(session):
+    """Shallow-copy a session item, converting only its float fields to Decimal."""
+    item = dict(session)
+    for field in SESSION_FLOAT_FIELDS:
+        if isinstance(item.get(field), float):
+            item[field] = Decimal(repr(item[field]))
+    if "messages" in item:
+        item["messages"] = [serialize_message(message) for message in item["messages"]]
+    return item
+
+
+def deserialize_session(item):
+    """Turn the Decimals of a session item read from DynamoDB back into floats / ints, in place."""
+    for field, kind in SESSION_NUMBER_FIELDS.items():
+        if isinstance(item.get(field), Decimal):
+            item[field] = kind(item[field])
+    summary = item.get("summary")
+    if summary and isinstance(summary.get("turns"), Decimal):
+        summary["turns"] = int(summary["turns"])
+    for message in item.get("messages", ()):
+        deserialize_message(message)
+    return item
@@ -0,0 +1,134 @@
+import os
+import asyncio
+import threading
+
+# Share one upstream stream between identical requests that are in flight together
+SINGLEFLIGHT_ENABLED = os.getenv("MODEL_SINGLEFLIGHT", "true").lower() in ("1", "true", "yes")
+
+
+class FlightCancelled(Exception):
+    """The shared stream was cancelled (e.g. its event loop shut down) while others still read it."""
+
+
+class _Flight:
+    def __init__(self, loop):
+        self.loop = loop
+        self.lock = threading.Lock()
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.waiters = set()
+        self.subscribers = 0
+        self.task = None
+
+
+def _wake(waiters):
+    for loop, event in waiters:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # That subscriber's loop has closed; nobody is waiting there any more
+            pass
+
+
+class SingleFlight:
+    """Coalesces identical concurrent streams.
+
+    The first caller for a key starts the upstream as a task on its own loop; it and
+    every caller arriving before the upstream finishes read the same chunk list,
+    from any thread or event loop. The upstream is cancelled once all of them have
+    gone, so a lone caller's deadlines still close the connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = {"leaders": 0, "followers": 0}
+
+    async def stream(self, key, start, on_follow=None):
+        """Yield the chunks of `start()` (an async generator), shared with other callers using `key`."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(loop)
+                self._stats["leaders"] += 1
+            else:
+                self._stats["followers"] += 1
+            flight.subscribers += 1
+
+        if leader:
+            flight.task = loop.create_task(self._produce(key, flight, start()))
+        elif on_follow is not None:
+            on_follow()
+
+        waiter = (loop, asyncio.Event())
+        index = 0
+        try:
+            while True:
+                with flight.lock:
+                    chunks = flight.chunks[index:]
+                    done, error = flight.done, flight.error
+                    if not chunks and not done:
+                        waiter[1].clear()
+                        flight.waiters.add(waiter)
+                if chunks:
+                    index += len(chunks)
+                    for chunk in chunks:
+                        yield chunk
+                elif done:
+                    if error is not None:
+                        raise error
+                    return
+                else:
+                    await waiter[1].wait()
+        finally:
+            with flight.lock:
+                flight.waiters.discard(waiter)
+                abandoned = not flight.done
+            with self._lock:
+                flight.subscribers -= 1
+                abandoned = abandoned and flight.subscribers == 0
+                if abandoned and self._flights.get(key) is flight:
+                    del self._flights[key]
+            if abandoned and flight.task is not None:
+                try:
+                    flight.loop.call_soon_threadsafe(flight.task.cancel)
+                except RuntimeError:
+                    pass
+
+    async def _produce(self, key, flight, gen):
+        error = None
+        try:
+            async for chunk in gen:
+                with flight.lock:
+                    flight.chunks.append(chunk)
+                    waiters, flight.waiters = flight.waiters, set()
+                _wake(waiters)
+        except asyncio.CancelledError:
+            error = FlightCancelled(f"Shared stream {key[:12]} was cancelled")
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            await gen.aclose()
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.lock:
+                flight.done = True
+                flight.error = error
+                waiters, flight.waiters = flight.waiters, set()
+            _wake(waiters)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights))
+
+
+_singleflight = SingleFlight()
+
+
+def get_singleflight():
+    return _singleflight
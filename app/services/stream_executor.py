@@ -0,0 +1,119 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.services.stream_multiplexer import upstream_issued_hook
+
+# Blocking SDK streams (boto3 / langchain) are read on this shared pool so the
+# event loop only ever waits on queue hand-offs and every model streams in parallel.
+MAX_STREAM_WORKERS = int(os.getenv("MODEL_STREAM_WORKERS", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_STREAM_WORKERS, thread_name_prefix="model-stream")
+_DONE = object()
+_worker_state = threading.local()
+
+
+class _StreamFailure:
+    def __init__(self, error):
+        self.error = error
+
+
+class _CancelScope:
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def add(self, callback):
+        with self._lock:
+            if not self.cancelled.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error cancelling stream: {e}")
+
+
+def on_stream_cancel(callback):
+    """Run `callback` if the consumer abandons the stream being read on this worker thread.
+
+    Lets code deep inside a blocking SDK call (e.g. a botocore event hook) register a
+    way to close the underlying connection, so a hung read is interrupted rather than
+    left to run until the socket times out. No-op outside `iterate_in_thread`.
+    """
+    scope = getattr(_worker_state, "cancel_scope", None)
+    if scope is not None:
+        scope.add(callback)
+
+
+async def iterate_in_thread(open_stream, executor=None):
+    """Iterate a blocking iterator on a worker thread, yielding its items asynchronously.
+
+    `open_stream` is called on the worker thread so connection setup is also kept
+    off the loop. Closing this generator stops the worker at the next item and
+    closes the underlying iterator; callbacks registered with `on_stream_cancel`
+    run immediately so a blocked read is interrupted too.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    on_issued = upstream_issued_hook()
+    scope = _CancelScope()
+    stop = scope.cancelled
+    finished = False
+
+    def publish(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Loop already closed: the consumer is gone.
+            stop.set()
+
+    def pump():
+        _worker_state.cancel_scope = scope
+        stream = None
+        try:
+            # Abandoned while queued for a worker: do not open (and pay for) the stream
+            if stop.is_set():
+                return
+            if on_issued is not None:
+                # Deadlines and TTFT only count from here, not time queued for this worker
+                loop.call_soon_threadsafe(on_issued)
+            stream = open_stream()
+            for item in stream:
+                if stop.is_set():
+                    break
+                publish(item)
+        except BaseException as e:
+            publish(_StreamFailure(e))
+        finally:
+            _worker_state.cancel_scope = None
+            close = getattr(stream, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+            publish(_DONE)
+
+    loop.run_in_executor(executor or _executor, pump)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                finished = True
+                return
+            if isinstance(item, _StreamFailure):
+                finished = True
+                raise item.error
+            yield item
+    finally:
+        if not finished:
+            scope.cancel()
@@ -0,0 +1,225 @@
+import asyncio
+import contextvars
+import functools
+import time
+from collections import namedtuple
+
+# One item from the merged stream. `done` marks a source that finished normally;
+# `error` carries the exception of a source that failed. Heartbeats have source None.
+StreamEvent = namedtuple("StreamEvent", ["source", "chunk", "done", "error"])
+
+# Set in the task draining each source, and inherited by the tasks it starts
+_on_upstream_issued = contextvars.ContextVar("on_upstream_issued", default=None)
+
+
+def upstream_issued_hook():
+    """Callback for the source drained in this context, to run on its loop once the upstream
+    request is actually sent (after any queueing); None outside a multiplexer."""
+    return _on_upstream_issued.get()
+
+
+class StreamTimeout(Exception):
+    def __init__(self, source, kind, seconds):
+        self.source = source
+        self.kind = kind
+        self.seconds = seconds
+        label = "first token" if kind == "ttft" else "completion"
+        super().__init__(f"{source} exceeded its {seconds:g}s deadline for {label}")
+
+
+class StreamMetrics:
+    def __init__(self, clock):
+        self.clock = clock
+        self.started_at = clock()
+        self.issued_at = None
+        self.first_chunk_at = None
+        self.last_chunk_at = None
+        self.finished_at = None
+        self.chunks = 0
+        self.gap_total = 0.0
+        self.gap_max = 0.0
+        self.error = None
+
+    def record_chunk(self):
+        now = self.clock()
+        if self.first_chunk_at is None:
+            self.first_chunk_at = now
+        else:
+            gap = now - self.last_chunk_at
+            self.gap_total += gap
+            self.gap_max = max(self.gap_max, gap)
+        self.last_chunk_at = now
+        self.chunks += 1
+
+    def finish(self, error=None):
+        self.finished_at = self.clock()
+        self.error = error
+
+    @property
+    def ttft_origin(self):
+        # Time spent queued before the upstream request was sent is not the model's
+        return self.issued_at if self.issued_at is not None else self.started_at
+
+    @property
+    def ttft(self):
+        return None if self.first_chunk_at is None else self.first_chunk_at - self.ttft_origin
+
+    def as_dict(self):
+        end = self.finished_at if self.finished_at is not None else self.clock()
+        return {
+            "ttft": self.ttft,
+            "queued": None if self.issued_at is None else self.issued_at - self.started_at,
+            "total": end - self.started_at,
+            "tokens": self.chunks,
+            "mean_gap": self.gap_total / (self.chunks - 1) if self.chunks > 1 else None,
+            "max_gap": self.gap_max if self.chunks > 1 else None,
+            "error": repr(self.error) if self.error else None,
+        }
+
+
+class StreamMultiplexer:
+    """Merges several named async generators into one stream of StreamEvents.
+
+    Each source is drained by a single long-lived task, so events arrive already
+    tagged with their source. Every generator is closed with `aclose()` when it
+    ends, fails, or the multiplexer is closed or cancelled; with `fail_fast`, the
+    first error closes all remaining sources.
+
+    `deadlines` maps a source to (ttft_seconds, total_seconds), either may be None.
+    A source that misses one is cancelled and reported as a StreamTimeout error. The
+    first-token clock restarts when the source reports its upstream request as issued
+    (see `upstream_issued_hook`); the total one runs from when the source is started.
+    """
+
+    def __init__(self, sources, fail_fast=False, clock=time.perf_counter, deadlines=None):
+        self.sources = dict(sources)
+        self.fail_fast = fail_fast
+        self.deadlines = deadlines or {}
+        self.clock = clock
+        self.metrics = {}
+        self._queue = None
+        self._tasks = {}
+        self._timers = {}
+        self._started = set()
+        self._expired = {}
+
+    def _expire(self, name, kind, seconds):
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            self._expired[name] = StreamTimeout(name, kind, seconds)
+            task.cancel()
+
+    def _schedule(self, name):
+        """Arm the timer for whichever of the source's deadlines comes first."""
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+        metrics = self.metrics[name]
+        ttft, total = self.deadlines.get(name, (None, None))
+        now = self.clock()
+        pending = []
+        if total:
+            pending.append((metrics.started_at + total - now, "total", total))
+        if ttft and metrics.chunks == 0:
+            pending.append((metrics.ttft_origin + ttft - now, "ttft", ttft))
+        if pending:
+            delay, kind, seconds = min(pending)
+            self._timers[name] = asyncio.get_running_loop().call_later(
+                max(0.0, delay), self._expire, name, kind, seconds
+            )
+
+    def _issued(self, name):
+        metrics = self.metrics[name]
+        # Retries and hedges issue again; the first request starts the clock
+        if metrics.issued_at is not None or metrics.finished_at is not None:
+            return
+        metrics.issued_at = self.clock()
+        if metrics.chunks == 0:
+            self._schedule(name)
+
+    async def _pump(self, name, gen):
+        self._started.add(name)
+        metrics = self.metrics[name]
+        _on_upstream_issued.set(functools.partial(self._issued, name))
+        self._schedule(name)
+        try:
+            async for chunk in gen:
+                first = metrics.chunks == 0
+                metrics.record_chunk()
+                if first:
+                    # First token arrived: only the overall deadline applies now
+                    self._schedule(name)
+                self._queue.put_nowait(StreamEvent(name, chunk, False, None))
+            metrics.finish()
+            self._queue.put_nowait(StreamEvent(name, None, True, None))
+        except asyncio.CancelledError:
+            timeout = self._expired.pop(name, None)
+            if timeout is None:
+                metrics.finish(asyncio.CancelledError())
+                raise
+            # Our own deadline fired: report it instead of propagating the cancel
+            current = asyncio.current_task()
+            if hasattr(current, "uncancel"):
+                current.uncancel()
+            metrics.finish(timeout)
+            self._queue.put_nowait(StreamEvent(name, None, False, timeout))
+        except Exception as e:
+            metrics.finish(e)
+            self._queue.put_nowait(StreamEvent(name, None, False, e))
+        finally:
+            timer = self._timers.pop(name, None)
+            if timer is not None:
+                timer.cancel()
+            await gen.aclose()
+
+    def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        for name, gen in self.sources.items():
+            self.metrics[name] = StreamMetrics(self.clock)
+            self._tasks[name] = asyncio.create_task(self._pump(name, gen))
+
+    async def events(self, heartbeat=None):
+        """Yield events until every source has finished or failed.
+
+        With `heartbeat` (seconds), an event with source None is yielded whenever
+        nothing arrived for that long, so callers can do periodic work.
+        """
+        self.start()
+        remaining = len(self._tasks)
+        try:
+            while remaining:
+                if heartbeat:
+                    try:
+                        event = await asyncio.wait_for(self._queue.get(), heartbeat)
+                    except asyncio.TimeoutError:
+                        yield StreamEvent(None, None, False, None)
+                        continue
+                else:
+                    event = await self._queue.get()
+                if event.done or event.error is not None:
+                    remaining -= 1
+                yield event
+                if event.error is not None and self.fail_fast:
+                    break
+        finally:
+            await self.aclose()
+
+    async def _close_unstarted(self, names):
+        # A task cancelled before its first step never runs _pump's cleanup
+        for name in names:
+            if name not in self._started:
+                self._started.add(name)
+                await self.sources[name].aclose()
+
+    async def aclose(self):
+        pending = [task for task in self._tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self._close_unstarted(list(self.sources))
+
+    def metrics_report(self):
+        return {name: metrics.as_dict() for name, metrics in self.metrics.items()}
@@ -0,0 +1,66 @@
+import os
+import time
+
+STREAM_RENDER_FPS = float(os.getenv("STREAM_RENDER_FPS", "10"))
+CURSOR = "▌"
+
+
+class StreamRenderer:
+    """Coalesces streamed chunks and repaints each placeholder at most `max_fps` times a second.
+
+    Every Streamlit `markdown` call ships the whole text to the browser, so painting
+    on every chunk costs O(n²) bytes per response. Chunks are buffered in a list and
+    joined only when a placeholder is actually repainted; `finish` always paints the
+    final text without the cursor.
+    """
+
+    def __init__(self, placeholders, max_fps=STREAM_RENDER_FPS, clock=time.monotonic):
+        self.placeholders = placeholders
+        self.interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        self.clock = clock
+        self._parts = {name: [] for name in placeholders}
+        self._dirty = set()
+        self._last_render = {name: float("-inf") for name in placeholders}
+        self.started_at = clock()
+        self.first_render_at = None
+        self.bytes_sent = 0
+        self.renders = 0
+
+    def text(self, name):
+        parts = self._parts[name]
+        if len(parts) > 1:
+            # Collapse so repeated reads stay cheap
+            parts[:] = ["".join(parts)]
+        return parts[0] if parts else ""
+
+    def _render(self, name, body):
+        self.placeholders[name].markdown(body)
+        self.bytes_sent += len(body.encode("utf-8"))
+        self.renders += 1
+        self._last_render[name] = self.clock()
+        if self.first_render_at is None:
+            self.first_render_at = self._last_render[name]
+        self._dirty.discard(name)
+
+    def append(self, name, chunk):
+        self._parts[name].append(chunk)
+        self._dirty.add(name)
+        if self.clock() - self._last_render[name] >= self.interval:
+            self._render(name, self.text(name) + CURSOR)
+
+    def flush_due(self):
+        """Repaint placeholders whose buffered chunks have waited at least one frame."""
+        now = self.clock()
+        for name in list(self._dirty):
+            if now - self._last_render[name] >= self.interval:
+                self._render(name, self.text(name) + CURSOR)
+
+    def finish(self, name):
+        self._render(name, self.text(name))
+
+    def stats(self):
+        return {
+            "first_paint": None if self.first_render_at is None else self.first_render_at - self.started_at,
+            "bytes_sent": self.bytes_sent,
+            "renders": self.renders,
+        }
@@ -0,0 +1,137 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage
+from app.services.aws_clients import get_chat_model
+
+# Cheap model used for compaction, e.g. amazon.titan-text-lite-v1. Unset disables it.
+SUMMARY_MODEL_ID = os.getenv("SUMMARY_MODEL_ID", "")
+# Newest user turns always sent verbatim; older ones are folded into the summary.
+SUMMARY_KEEP_TURNS = int(os.getenv("SUMMARY_KEEP_TURNS", "6"))
+# Only re-summarize once this many turns have fallen out of the verbatim window.
+SUMMARY_MIN_NEW_TURNS = int(os.getenv("SUMMARY_MIN_NEW_TURNS", "4"))
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation below for use as context in later replies. "
+    "Keep facts, decisions, names and open questions; drop pleasantries. "
+    "Answer with the summary only, in at most 200 words."
+)
+
+
+class ConversationSummarizer:
+    """Maintains a running summary of each session's older turns off the request path.
+
+    After a response finishes, `schedule` summarizes the turns that have fallen out
+    of the verbatim window on a background thread. The next request picks up
+    whatever summary is ready; it never waits for one.
+    """
+
+    def __init__(self, model_id=SUMMARY_MODEL_ID, keep_turns=SUMMARY_KEEP_TURNS,
+                 min_new_turns=SUMMARY_MIN_NEW_TURNS, region="us-east-1"):
+        self.model_id = model_id
+        self.keep_turns = keep_turns
+        self.min_new_turns = min_new_turns
+        self.region = region
+        self._lock = threading.Lock()
+        self._summaries = {}
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarizer")
+
+    @property
+    def enabled(self):
+        return bool(self.model_id)
+
+    def get(self, session_id):
+        with self._lock:
+            return self._summaries.get(session_id)
+
+    def restore(self, session_id, summary):
+        """Seed the summary for a session loaded from storage."""
+        if summary and summary.get("text"):
+            with self._lock:
+                self._summaries[session_id] = {"text": summary["text"], "turns": int(summary.get("turns", 0))}
+
+    @staticmethod
+    def count_turns(chat_history):
+        return sum(1 for message in chat_history if message.get("role") == "user")
+
+    def schedule(self, session_id, chat_history, on_complete=None):
+        if not self.enabled:
+            return False
+
+        target_turns = self.count_turns(chat_history) - self.keep_turns
+        with self._lock:
+            current = self._summaries.get(session_id)
+            covered = current["turns"] if current else 0
+            if target_turns - covered < self.min_new_turns or session_id in self._pending:
+                return False
+            self._pending.add(session_id)
+
+        self._executor.submit(self._summarize, session_id, list(chat_history), current, target_turns, on_complete)
+        return True
+
+    def _summarize(self, session_id, chat_history, current, target_turns, on_complete):
+        try:
+            covered = current["turns"] if current else 0
+            transcript = self._format_turns(chat_history, covered, target_turns)
+            prompt = SUMMARY_INSTRUCTIONS
+            if current:
+                prompt += f"\n\nSummary so far:\n{current['text']}"
+            prompt += f"\n\nConversation:\n{transcript}"
+
+            llm = get_chat_model(self.model_id, self.region, 0.0)
+            result = llm.invoke([HumanMessage(content=prompt)])
+            text = result.content if isinstance(result.content, str) else "".join(
+                item.get("text", "") for item in result.content if isinstance(item, dict)
+            )
+            if not text.strip():
+                return
+
+            summary = {"text": text.strip(), "turns": target_turns}
+            with self._lock:
+                self._summaries[session_id] = summary
+            if on_complete:
+                on_complete(summary)
+        except Exception as e:
+            print(f"Error summarizing session {session_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(session_id)
+
+    @staticmethod
+    def _format_turns(chat_history, start_turn, end_turn):
+        lines = []
+        turn = 0
+        for message in chat_history:
+            role = message.get("role")
+            if role == "user":
+                turn += 1
+                if turn > end_turn:
+                    break
+            if turn <= start_turn:
+                continue
+            if role == "user":
+                lines.append(f"User: {message.get('content', '')}")
+            elif role == "assistant":
+                for key, response in message.get("responses", {}).items():
+                    lines.append(f"{key}: {response}")
+        return "\n".join(lines)
+
+
+def compact_history(summary, system_content, messages, turn_starts):
+    """Replace the turns covered by `summary` with the summary text in the system content.
+
+    Returns (system_content, messages); unchanged when there is nothing to compact.
+    """
+    if not summary or not summary["turns"] or summary["turns"] >= len(turn_starts):
+        return system_content, messages
+    start = turn_starts[summary["turns"]]
+    compacted_system = f"{system_content or ''}\n\nSummary of the earlier conversation:\n{summary['text']}".strip()
+    return compacted_system, messages[start:]
+
+
+_summarizer = ConversationSummarizer()
+
+
+def get_summarizer():
+    return _summarizer
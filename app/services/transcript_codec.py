@@ -0,0 +1,49 @@
+import json
+import zlib
+from decimal import Decimal
+
+# First byte of every encoded payload, so the format can change without a migration
+RAW_JSON = 0
+ZLIB_JSON = 1
+
+COMPRESSION_LEVEL = 6
+
+
+class TranscriptCodecError(ValueError):
+    pass
+
+
+def _json_default(value):
+    # Numbers read back from DynamoDB arrive as Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a transcript")
+
+
+def dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def pack(raw, level=COMPRESSION_LEVEL):
+    """Version byte plus zlib-compressed JSON, or plain JSON when compressing does not help."""
+    compressed = zlib.compress(raw, level)
+    if len(compressed) < len(raw):
+        return bytes([ZLIB_JSON]) + compressed
+    return bytes([RAW_JSON]) + raw
+
+
+def encode(obj, level=COMPRESSION_LEVEL):
+    return pack(dumps(obj), level)
+
+
+def decode(data):
+    # boto3 returns binary attributes wrapped in boto3.dynamodb.types.Binary
+    data = bytes(getattr(data, "value", data))
+    if not data:
+        raise TranscriptCodecError("Empty transcript payload")
+    version, body = data[0], data[1:]
+    if version == ZLIB_JSON:
+        body = zlib.decompress(body)
+    elif version != RAW_JSON:
+        raise TranscriptCodecError(f"Unknown transcript format version {version}")
+    return json.loads(body.decode("utf-8"))
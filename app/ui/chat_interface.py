@@ -1,14 +1,21 @@
 import streamlit as st
-import asyncio
+import functools
 from app.services.model_streamer import ModelStreamer
 from app.chat_history_db import ChatSessionManagerDynamoDB
+from app.services.conversation_cache import ConversationCache
+from app.services.summarizer import get_summarizer
+from app.services.rerun_profiler import phase
+from app.services import metrics
+from app.services.stream_renderer import STREAM_RENDER_FPS
+from app.services.generation_worker import CANCELLED, get_generation_worker
+from app.services.circuit_breaker import OPEN, breaker_state
 import os
 
-def render_chat_interface():
+def render_chat_interface(session_handler=None):
     streamer = ModelStreamer()
-    session_handler = ChatSessionManagerDynamoDB()
+    session_handler = session_handler or ChatSessionManagerDynamoDB()
     # Main chat interface
-    model_map = streamer.load_model_config("/home/ec2-user/chatbot/config/model_config.json")
+    model_map = streamer.model_map
     
     if not st.session_state.messages:
         st.markdown("""
@@ -19,37 +26,54 @@ def render_chat_interface():
         """, unsafe_allow_html=True)
 
     # Display chat messages
-    for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(
-                f"<div class='user-message'><strong>You:</strong><br>{message['content']}</div>",
-                unsafe_allow_html=True
-            )
-        elif message["role"] == "assistant":
-            if isinstance(message.get("responses"), dict) and message["responses"]:
-                keys = list(message["responses"].keys())
-
-                # Ensure keys are non-empty before rendering columns
-                if keys:
-                    cols = st.columns(len(keys))
-                    for i, key in enumerate(keys):
-                        with cols[i]:
-                            pretty_name = key.replace("-", " ").title()
-                            st.markdown(
-                                f"<div class='arena-column'><div class='model-label'>{pretty_name}</div><div>{message['responses'][key]}</div></div>",
-                                unsafe_allow_html=True
-                            )
-            elif "content" in message:
+    with phase("transcript"):
+        for message in st.session_state.messages:
+            if message["role"] == "user":
                 st.markdown(
-                    f"<div class='assistant-message'><strong>Assistant:</strong><br>{message['content']}</div>",
+                    f"<div class='user-message'><strong>You:</strong><br>{message['content']}</div>",
                     unsafe_allow_html=True
                 )
+            elif message["role"] == "assistant":
+                if isinstance(message.get("responses"), dict) and message["responses"]:
+                    keys = list(message["responses"].keys())
+
+                    # Ensure keys are non-empty before rendering columns
+                    if keys:
+                        cols = st.columns(len(keys))
+                        for i, key in enumerate(keys):
+                            with cols[i]:
+                                pretty_name = key.replace("-", " ").title()
+                                st.markdown(
+                                    f"<div class='arena-column'><div class='model-label'>{pretty_name}</div><div>{message['responses'][key]}</div></div>",
+                                    unsafe_allow_html=True
+                                )
+                                dropped = message.get("dropped_turns", {}).get(key)
+                                if dropped:
+                                    st.caption(f"{dropped} earlier turns omitted to fit the context window")
+                elif "content" in message:
+                    st.markdown(
+                        f"<div class='assistant-message'><strong>Assistant:</strong><br>{message['content']}</div>",
+                        unsafe_allow_html=True
+                    )
+
+    # A turn still generating in the background belongs to the session it was sent from
+    job = st.session_state.get("generation_job")
+    if job is not None and job.session_id != st.session_state.session_id:
+        job.cancel()
+        job = st.session_state.generation_job = None
 
     # Chat input
-    if user_query := st.chat_input("Type your message..."):
+    if user_query := st.chat_input("Type your message...", disabled=job is not None):
+        # Drop models that were removed from the config since they were selected
+        st.session_state.selected_models = [m for m in st.session_state.selected_models if m in model_map]
         if not st.session_state.selected_models:
             st.error("Please select at least one model")
             return
+        # Models failing repeatedly stay selected but sit this turn out
+        models = [m for m in st.session_state.selected_models if breaker_state(model_map[m]["id"]) != OPEN]
+        if not models:
+            st.error("The selected models are temporarily unavailable; please try again shortly")
+            return
 
         # Add user message
         st.session_state.messages.append({"role": "user", "content": user_query})
@@ -58,40 +82,132 @@ def render_chat_interface():
         if len(st.session_state.messages) == 1 and not st.session_state.session_name:
             st.session_state.session_name = user_query[:60]
 
-        with st.spinner("Generating response..."):
-            # Create placeholders for streaming responses
-            placeholders = {}
-            cols = st.columns(len(st.session_state.selected_models))
-            for i, model_name in enumerate(st.session_state.selected_models):
-                with cols[i]:
-                    st.markdown(f"<div class='arena-column'><div class='model-label'>{model_name}</div></div>", unsafe_allow_html=True)
-                    placeholders[model_name] = st.empty()
-
-            try:
-                # Get responses from selected models
-                responses = asyncio.run(
-                    streamer.stream_models(
-                        st.session_state.selected_models,
-                        st.session_state.prev_system_prompt,
-                        st.session_state.messages,
-                        st.session_state.temperature,
-                        placeholders
-                    )
-                )
-                
-                # Add assistant responses
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "responses": {
-                        model_map[name]["key"]: responses[name] for name in st.session_state.selected_models
-                    }
-                })
-                
-                # Auto-save session only if saving is enabled
-                if st.session_state.save_data_enabled:
-                    session_handler.save_session()
-                
-            except Exception as e:
-                st.error(f"Error generating response: {e}")
-        
-        st.rerun()
+        conversation_cache = st.session_state.setdefault("conversation_cache", ConversationCache())
+        conversation_cache.sync(st.session_state.session_id, st.session_state.prev_system_prompt)
+
+        # Hand the streams to the worker so later reruns can't cut them off
+        job = st.session_state.generation_job = get_generation_worker().submit(
+            st.session_state.session_id,
+            models,
+            functools.partial(
+                _generate,
+                streamer,
+                models,
+                st.session_state.prev_system_prompt,
+                list(st.session_state.messages),
+                st.session_state.temperature,
+                conversation_cache=conversation_cache,
+                summary=get_summarizer().get(st.session_state.session_id)
+            )
+        )
+
+    if job is not None:
+        _attach_generation(job, session_handler, model_map)
+
+
+async def _generate(streamer, selected_models, system_prompt, chat_history, temperature, placeholders, **kwargs):
+    responses = await streamer.stream_models(
+        selected_models, system_prompt, chat_history, temperature, placeholders, **kwargs
+    )
+    return {
+        "responses": responses,
+        "dropped_turns": streamer.last_dropped_turns,
+        "turn_stats": streamer.last_turn_stats,
+    }
+
+
+def _attach_generation(job, session_handler, model_map):
+    """Repaint a background turn as it streams, then record it once it has finished."""
+    with st.spinner("Generating response..."):
+        # Create placeholders for streaming responses
+        placeholders = {}
+        cols = st.columns(len(job.model_names))
+        for i, model_name in enumerate(job.model_names):
+            with cols[i]:
+                st.markdown(f"<div class='arena-column'><div class='model-label'>{model_name}</div></div>", unsafe_allow_html=True)
+                placeholders[model_name] = st.empty()
+        status = st.empty()
+
+        # What the browser was actually sent for this turn, kept across reruns that re-attach
+        paint = st.session_state.get("turn_paint_stats")
+        if paint is None or paint["job_id"] != job.id:
+            paint = st.session_state.turn_paint_stats = {"job_id": job.id, "first_paint": None, "bytes_sent": 0, "renders": 0}
+
+        interval = 1.0 / STREAM_RENDER_FPS if STREAM_RENDER_FPS > 0 else 0.1
+        version, painted, shown_seconds = None, {}, None
+        with phase("model_streaming"):
+            while True:
+                version, texts, finished = job.wait(version, interval)
+                for name, text in texts.items():
+                    # The worker replaces the whole body on each paint, so identity means unchanged
+                    if text and text is not painted.get(name):
+                        with metrics.span("arena_placeholder_render_seconds"):
+                            placeholders[name].markdown(text)
+                        painted[name] = text
+                        paint["bytes_sent"] += len(text.encode("utf-8"))
+                        paint["renders"] += 1
+                        if paint["first_paint"] is None:
+                            paint["first_paint"] = job.elapsed()
+                if finished:
+                    break
+                # Touching an element each second lets Streamlit interrupt this loop for a rerun
+                seconds = int(job.elapsed())
+                if seconds != shown_seconds:
+                    status.caption(f"Generating for {seconds}s")
+                    shown_seconds = seconds
+        status.empty()
+
+    st.session_state.generation_job = None
+    if job.status == CANCELLED:
+        return
+
+    if job.error is not None:
+        st.error(f"Error generating response: {job.error}")
+    else:
+        try:
+            _record_turn(job, session_handler, model_map)
+        except Exception as e:
+            st.error(f"Error generating response: {e}")
+
+    st.rerun()
+
+
+def _record_turn(job, session_handler, model_map):
+    responses = job.result["responses"]
+    summarizer = get_summarizer()
+
+    # Add assistant responses
+    assistant_message = {
+        "role": "assistant",
+        "responses": {
+            model_map[name]["key"]: responses[name] for name in job.model_names if name in model_map
+        }
+    }
+    dropped_turns = {
+        model_map[name]["key"]: count for name, count in job.result["dropped_turns"].items() if count and name in model_map
+    }
+    if dropped_turns:
+        assistant_message["dropped_turns"] = dropped_turns
+    st.session_state.messages.append(assistant_message)
+    # The worker's render stats only count its buffer writes; "paint" is what reached the page
+    paint = st.session_state.pop("turn_paint_stats", None) or {}
+    st.session_state.last_turn_stats = dict(
+        job.result["turn_stats"],
+        paint={
+            "first_paint": paint.get("first_paint"),
+            "bytes_sent": paint.get("bytes_sent", 0),
+            "renders": paint.get("renders", 0),
+        }
+    )
+    
+    # Auto-save session only if saving is enabled
+    if st.session_state.save_data_enabled:
+        session_handler.save_session()
+
+    # Compact older turns in the background, off the next request's path
+    if summarizer.enabled:
+        on_summary = None
+        if st.session_state.save_data_enabled:
+            user_id, session_id = st.session_state.user_id, st.session_state.session_id
+            on_summary = lambda summary: session_handler.save_summary(user_id, session_id, summary)
+        summarizer.schedule(st.session_state.session_id, st.session_state.messages, on_summary)
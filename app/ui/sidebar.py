@@ -1,6 +1,10 @@
 import uuid
 import streamlit as st
 from datetime import datetime
+from app.services.model_registry import get_model_registry
+from app.services.summarizer import get_summarizer
+from app.services.circuit_breaker import OPEN, breaker_state
+from app.services.rerun_profiler import PHASES, is_admin
 
 
 class SidebarManager:
@@ -29,17 +33,23 @@ class SidebarManager:
             elif st.session_state.sidebar_view == "Session History":
                 self._render_session_history()
 
+            if is_admin(st.session_state.get("user_id")):
+                self._render_profiler_panel()
+
     def _render_model_selection(self):
         with st.expander("🤖 Model Selection", expanded=False):
-            model_checkboxes = {
-                "Amazon-Titan-Lite": st.checkbox("Amazon-Titan-Lite", value="Amazon-Titan-Lite" in st.session_state.selected_models),
-                "Amazon-Titan-Express": st.checkbox("Amazon-Titan-Express", value="Amazon-Titan-Express" in st.session_state.selected_models),
-                #"Amazon-Nova-Pro": st.checkbox("Amazon-Nova-Pro", value="Amazon-Nova-Pro" in st.session_state.selected_models),
-                # "Claude-4-Sonnet": st.checkbox("Claude-4-Sonnet", value="Claude-4-Sonnet" in st.session_state.selected_models),
-                # "DeepSeek-R1": st.checkbox("DeepSeek-R1", value="DeepSeek-R1" in st.session_state.selected_models),
-                # "Claude-4-Opus": st.checkbox("Claude-4-Opus", value="Claude-4-Opus" in st.session_state.selected_models),
-                # "Claude-3.5-Haiku": st.checkbox("Claude-3.5-Haiku", value="Claude-3.5-Haiku" in st.session_state.selected_models),
-            }
+            # Models come from config/model_config.json; add entries there to offer more.
+            # Models whose circuit breaker is open are greyed out until they recover; they
+            # stay selected and are only left out of the turns sent meanwhile.
+            model_checkboxes = {}
+            for name, info in get_model_registry().models().items():
+                unhealthy = breaker_state(info["id"]) == OPEN
+                model_checkboxes[name] = st.checkbox(
+                    f"{name} (unavailable)" if unhealthy else name,
+                    value=name in st.session_state.selected_models,
+                    disabled=unhealthy,
+                    help="Failing repeatedly; temporarily disabled." if unhealthy else None
+                )
 
             st.session_state.selected_models = [model for model, selected in model_checkboxes.items() if selected]
             selected_count = len(st.session_state.selected_models)
@@ -125,6 +135,40 @@ class SidebarManager:
                 st.session_state.session_name = ""
                 st.rerun()
 
+    def _render_profiler_panel(self):
+        with st.expander("⏱️ Rerun Profiler", expanded=False):
+            st.checkbox("Profile each rerun", key="profile_reruns")
+
+            profiles = st.session_state.get("rerun_profiles", [])
+            if not profiles:
+                st.caption("No profiled reruns yet.")
+                return
+
+            # The panel is drawn mid-rerun, so the newest record is the previous rerun
+            last = profiles[-1]
+            rows = [
+                {"phase": name, "seconds": round(last["phases"][name], 4), "share": f"{last['phases'][name] / last['total']:.0%}"}
+                for name in PHASES if name in last["phases"]
+            ]
+            other = last["total"] - sum(last["phases"].values())
+            rows.append({"phase": "other", "seconds": round(other, 4), "share": f"{other / last['total']:.0%}"})
+            st.markdown(f"Last rerun: **{last['total']:.3f}s** at {last['finished_at']}")
+            st.table(rows)
+
+            labels = [f"{p['finished_at']} ({p['total']:.2f}s)" for p in reversed(profiles)]
+            choice = st.selectbox("Profile", range(len(labels)), format_func=lambda i: labels[i])
+            record = profiles[-1 - choice]
+            if record["profile"] is None:
+                st.caption("cProfile was busy with another rerun; only phase timings were kept.")
+            else:
+                st.download_button(
+                    "Download .prof",
+                    data=record["profile"],
+                    file_name=f"rerun-{record['finished_at'].replace(':', '')}.prof",
+                    mime="application/octet-stream"
+                )
+                st.code(record["top"], language=None)
+
     def _render_session_history(self):
         st.subheader("Past Conversations")
 
@@ -132,20 +176,25 @@ class SidebarManager:
             st.warning("Data saving is disabled. Enable it to view session history.")
             return
 
-        sessions = self.session_handler.load_all_sessions()
-        if sessions:
-            sorted_sessions = sorted(sessions, key=lambda x: x["created_at"], reverse=True)
-            for session in sorted_sessions:
+        # Pages fetched so far (newest first); save_session and delete_session reset this
+        history = st.session_state.get("session_history")
+        if history is None or history["user_id"] != st.session_state.user_id:
+            sessions, next_key = self.session_handler.load_sessions_page()
+            history = st.session_state.session_history = {
+                "user_id": st.session_state.user_id,
+                "sessions": sessions,
+                "next_key": next_key
+            }
+
+        if history["sessions"]:
+            for session in history["sessions"]:
                 with st.expander(f"{session['session_name'] or 'Unnamed Session'} — {session['created_at'][:19]}"):
-                    for msg in session["messages"][:3]:
-                        if msg["role"] == "user":
-                            st.markdown(f"**User:** {msg['content'][:100]}{'...' if len(msg['content']) > 100 else ''}")
-                        elif msg["role"] == "assistant":
-                            if "responses" in msg:
-                                for model, response in msg["responses"].items():
-                                    st.markdown(f"**{model}:** {response[:100]}{'...' if len(response) > 100 else ''}")
-                            elif "content" in msg:
-                                st.markdown(f"**Assistant:** {msg['content'][:100]}{'...' if len(msg['content']) > 100 else ''}")
+                    preview = session.get("preview")
+                    if preview is None:
+                        # Saved before previews were stored; build it once and keep it with the page
+                        preview = session["preview"] = self.session_handler.load_preview(session["session_id"])
+                    for line in preview:
+                        st.markdown(f"**{line['speaker']}:** {line['text']}")
 
                     col1, col2 = st.columns(2)
                     with col1:
@@ -153,6 +202,9 @@ class SidebarManager:
                             if st.session_state.messages and st.session_state.save_data_enabled:
                                 self.session_handler.save_session()
 
+                            session = self.session_handler.load_session_by_id(session['session_id'])
+                            if session is None:
+                                return
                             st.session_state.session_id = session['session_id']
                             st.session_state.session_name = session['session_name']
                             st.session_state.created_at = session['created_at']
@@ -160,6 +212,7 @@ class SidebarManager:
                             st.session_state.prev_system_prompt = session.get('system_prompt', 'You are a helpful assistant')
                             st.session_state.temperature = session.get('temperature', 0.7)
                             st.session_state.selected_models = session.get('selected_models', [])
+                            get_summarizer().restore(session['session_id'], session.get('summary'))
                             st.success(f"Loaded session: {session['session_name'] or 'Unnamed Session'}")
                             st.rerun()
                     with col2:
@@ -167,5 +220,11 @@ class SidebarManager:
                             if self.session_handler.delete_session(session['session_id']):
                                 st.success("Session deleted successfully")
                                 st.rerun()
+
+            if history["next_key"] is not None and st.button("Load more"):
+                sessions, next_key = self.session_handler.load_sessions_page(start_key=history["next_key"])
+                history["sessions"].extend(sessions)
+                history["next_key"] = next_key
+                st.rerun()
         else:
             st.info("No past sessions found.")
@@ -0,0 +1,116 @@
+"""End-to-end latency of one chat turn through render_chat_interface.
+
+Drives app.py with Streamlit's AppTest harness, using the offline fake Bedrock
+backend and an in-memory session table, for each combination of model count and
+pre-loaded history length. Prints (or writes) JSON so releases can be compared.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_chat_turn --models 1,2,4,8 --history 1,10,100,1000 --output turn.json
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+# The backend and model list are read at import time, so set them before any app import.
+BENCH_MODELS = 8
+_config = {
+    f"Bench-Model-{i}": {"id": f"bench.model-{i}", "key": f"bench-model-{i}", "provider": "bench", "backend": "fake"}
+    for i in range(1, BENCH_MODELS + 1)
+}
+_config_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+json.dump(_config, _config_file)
+_config_file.close()
+os.environ["MODEL_CONFIG_PATH"] = _config_file.name
+os.environ["MODEL_BACKEND"] = "fake"
+os.environ.setdefault("FAKE_BEDROCK_TTFT", "0.3")
+os.environ.setdefault("FAKE_BEDROCK_TOKENS_PER_SECOND", "80")
+os.environ.setdefault("FAKE_BEDROCK_JITTER", "0.1")
+os.environ.setdefault("FAKE_BEDROCK_MAX_TOKENS", "80")
+
+from streamlit.testing.v1 import AppTest
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_turn_app.py")
+
+
+def _history(model_names, turns):
+    keys = [_config[name]["key"] for name in model_names]
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"Earlier question number {turn}, with some detail."})
+        messages.append({
+            "role": "assistant",
+            "responses": {key: f"Earlier answer {turn} from {key}. " * 6 for key in keys},
+        })
+    return messages
+
+
+def run_turn(model_count, history_turns, timeout):
+    model_names = list(_config)[:model_count]
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+    at.session_state["authenticated"] = True
+    at.session_state["user_id"] = "bench@example.com"
+    at.session_state["selected_models"] = model_names
+    at.session_state["messages"] = _history(model_names, history_turns)
+    at.session_state["session_name"] = "bench"
+    at.run()
+
+    runs_before = at.session_state["bench_runs"]
+    start = time.perf_counter()
+    at.chat_input[0].set_value("How long does a chat turn take?").run()
+    elapsed = time.perf_counter() - start
+
+    if at.exception:
+        raise RuntimeError(f"App raised during the turn: {at.exception}")
+    stats = at.session_state["last_turn_stats"]
+    # Paint numbers come from the script's st.empty() repaints, first paint timed from submission
+    paint = stats["paint"]
+    return {
+        "models": model_count,
+        "history_turns": history_turns,
+        "turn_seconds": elapsed,
+        "stream_seconds": stats["total"],
+        "first_paint_seconds": paint["first_paint"],
+        "ttft_seconds": {name: metrics["ttft"] for name, metrics in stats["models"].items()},
+        "bytes_to_placeholders": paint["bytes_sent"],
+        "placeholder_renders": paint["renders"],
+        "reruns": at.session_state["bench_runs"] - runs_before,
+    }
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=_int_list, default=[1, 2, 4, 8])
+    parser.add_argument("--history", type=_int_list, default=[1, 10, 100, 1000])
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = [
+        run_turn(model_count, history_turns, args.timeout)
+        for model_count in args.models
+        if model_count <= BENCH_MODELS
+        for history_turns in args.history
+    ]
+    report = {
+        "python": platform.python_version(),
+        "fake_backend": {name: os.environ[name] for name in os.environ if name.startswith("FAKE_BEDROCK_")},
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
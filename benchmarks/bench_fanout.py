@@ -0,0 +1,84 @@
+"""Fan-out latency: N models streamed together should take about as long as the slowest one.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_fanout
+"""
+import asyncio
+import itertools
+import json
+import tempfile
+import time
+
+from app.services.model_registry import ModelRegistry
+from app.services.model_streamer import ModelStreamer
+from app.services.semantic_cache import SemanticCache
+
+
+class _SlowLLM:
+    """Blocking stand-in for ChatBedrockConverse.stream with a fixed per-token delay."""
+
+    def __init__(self, tokens, delay):
+        self.tokens = tokens
+        self.delay = delay
+
+    def stream(self, messages):
+        for i in range(self.tokens):
+            time.sleep(self.delay)
+            yield type("Chunk", (), {"content": [{"type": "text", "text": f"t{i} "}]})()
+
+
+class _NullPlaceholder:
+    def markdown(self, text):
+        pass
+
+
+# (tokens, per-token delay) for each simulated model; the last one is the slowest.
+PROFILES = [(20, 0.01), (20, 0.015), (20, 0.02), (20, 0.025)]
+# Non-zero so the response cache never replays an earlier run's answer
+TEMPERATURE = 0.7
+
+_model_ids = itertools.count()
+
+
+def _make_streamer(profiles):
+    # Fresh ids per run, so no run shares a cache entry or in-flight stream with another
+    names = [f"model-{next(_model_ids)}" for _ in profiles]
+    config = {name: {"id": name, "key": name, "provider": "bench"} for name in names}
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(config, f)
+    streamer = ModelStreamer(registry=ModelRegistry(f.name))
+    streamer.semantic_cache = SemanticCache(directory="")
+    by_id = dict(zip(names, profiles))
+    streamer.create_llm = lambda model_id, temperature: _SlowLLM(*by_id[model_id])
+    return streamer, names
+
+
+def _run(streamer, names):
+    placeholders = {name: _NullPlaceholder() for name in names}
+    history = [{"role": "user", "content": "hello"}]
+    start = time.perf_counter()
+    asyncio.run(streamer.stream_models(names, "You are a helpful assistant", history, TEMPERATURE, placeholders))
+    return time.perf_counter() - start
+
+
+def main():
+    singles = []
+    for profile in PROFILES:
+        streamer, names = _make_streamer([profile])
+        singles.append(_run(streamer, names))
+
+    results = {"single_model_s": singles, "fanout_s": {}}
+    for n in range(1, len(PROFILES) + 1):
+        streamer, names = _make_streamer(PROFILES[:n])
+        elapsed = _run(streamer, names)
+        results["fanout_s"][n] = {
+            "wall": elapsed,
+            "slowest_single": max(singles[:n]),
+            "sum_of_singles": sum(singles[:n]),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Prompt assembly cost over a whole session: full rebuild per send vs ConversationCache.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_history
+"""
+import json
+import time
+
+from app.services.conversation_cache import ConversationCache
+from app.services.model_streamer import ModelStreamer
+
+MODEL_KEYS = ["titan-text-lite", "titan-text-express"]
+SYSTEM_PROMPT = "You are a helpful assistant"
+
+
+def _simulate(turns, build_prompts):
+    """Grow a transcript to `turns` sends, timing prompt assembly on each send."""
+    chat_history = []
+    total = 0.0
+    last = 0.0
+    for turn in range(turns):
+        chat_history.append({"role": "user", "content": f"question {turn} " * 20})
+        start = time.perf_counter()
+        build_prompts(chat_history)
+        last = time.perf_counter() - start
+        total += last
+        chat_history.append({
+            "role": "assistant",
+            "responses": {key: f"answer {turn} from {key} " * 40 for key in MODEL_KEYS},
+        })
+    return {"total_ms": total * 1000, "last_send_ms": last * 1000}
+
+
+def main():
+    streamer = ModelStreamer()
+
+    def rebuild(chat_history):
+        history_by_model = streamer.get_history_per_model(chat_history, MODEL_KEYS)
+        for key in MODEL_KEYS:
+            streamer.build_messages_for_titan(
+                history_by_model[key]["system_content"] or SYSTEM_PROMPT,
+                history_by_model[key]["messages"],
+            )
+
+    results = {}
+    for turns in (10, 100, 1000):
+        cache = ConversationCache()
+        cache.sync("bench-session", SYSTEM_PROMPT)
+        results[turns] = {
+            "full_rebuild": _simulate(turns, rebuild),
+            "incremental": _simulate(
+                turns,
+                lambda chat_history: cache.histories(chat_history, MODEL_KEYS, streamer.build_messages_for_titan),
+            ),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
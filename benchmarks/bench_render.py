@@ -0,0 +1,81 @@
+"""Bytes pushed to placeholders and CPU per response: paint-every-chunk vs StreamRenderer.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_render
+"""
+import json
+import time
+
+from app.services.stream_renderer import CURSOR, StreamRenderer
+
+MODELS = 4
+TOKENS = 600
+TOKENS_PER_SECOND = 50
+CHUNK = "token "
+
+
+class _CountingPlaceholder:
+    def __init__(self):
+        self.bytes = 0
+        self.calls = 0
+
+    def markdown(self, text):
+        # Streamlit serialises the full body on every call
+        self.bytes += len(text.encode("utf-8"))
+        self.calls += 1
+
+
+class _SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _paint_every_chunk():
+    placeholders = {f"model-{i}": _CountingPlaceholder() for i in range(MODELS)}
+    responses = {name: "" for name in placeholders}
+    start = time.process_time()
+    for _ in range(TOKENS):
+        for name, placeholder in placeholders.items():
+            responses[name] += CHUNK
+            placeholder.markdown(responses[name] + CURSOR)
+    for name, placeholder in placeholders.items():
+        placeholder.markdown(responses[name])
+    return placeholders, time.process_time() - start
+
+
+def _render_scheduled(max_fps):
+    placeholders = {f"model-{i}": _CountingPlaceholder() for i in range(MODELS)}
+    clock = _SimulatedClock()
+    renderer = StreamRenderer(placeholders, max_fps=max_fps, clock=clock)
+    start = time.process_time()
+    for _ in range(TOKENS):
+        clock.now += 1.0 / TOKENS_PER_SECOND
+        for name in placeholders:
+            renderer.append(name, CHUNK)
+        renderer.flush_due()
+    for name in placeholders:
+        renderer.finish(name)
+    return placeholders, time.process_time() - start
+
+
+def _summary(placeholders, cpu_seconds):
+    return {
+        "bytes_per_response": sum(p.bytes for p in placeholders.values()) / len(placeholders),
+        "markdown_calls_per_response": sum(p.calls for p in placeholders.values()) / len(placeholders),
+        "cpu_ms_per_response": cpu_seconds * 1000 / len(placeholders),
+    }
+
+
+def main():
+    results = {"every_chunk": _summary(*_paint_every_chunk())}
+    for fps in (4, 10, 30):
+        results[f"scheduled_{fps}fps"] = _summary(*_render_scheduled(fps))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
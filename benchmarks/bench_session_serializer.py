@@ -0,0 +1,92 @@
+"""Session serialization cost: the old recursive convert_floats_to_decimal vs session_serializer.
+
+Both convert a whole session item (metadata plus messages, as save_session used to
+write it) into something boto3 accepts; the report gives time and peak allocation
+per call on sessions of 1,000 turns, and checks the round trip back to floats.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_session_serializer
+"""
+import json
+import time
+import tracemalloc
+from decimal import Decimal
+
+from app.services.session_serializer import deserialize_session, serialize_session
+
+MODEL_KEYS = [f"model-{i}" for i in range(1, 5)]
+REPEATS = 5
+
+
+def legacy_convert_floats_to_decimal(obj):
+    """ChatSessionManagerDynamoDB.convert_floats_to_decimal as it was before session_serializer."""
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    elif isinstance(obj, dict):
+        return {k: legacy_convert_floats_to_decimal(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [legacy_convert_floats_to_decimal(i) for i in obj]
+    elif isinstance(obj, tuple):
+        return tuple(legacy_convert_floats_to_decimal(i) for i in obj)
+    else:
+        return obj
+
+
+def _session(turns):
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"question {turn} " * 20})
+        assistant = {"role": "assistant", "responses": {key: f"answer {turn} from {key} " * 40 for key in MODEL_KEYS}}
+        if turn % 10 == 0:
+            assistant["dropped_turns"] = {MODEL_KEYS[0]: turn // 10}
+        messages.append(assistant)
+    return {
+        "user_id": "bench@example.com",
+        "session_id": "bench-session",
+        "session_name": "bench",
+        "created_at": "2026-01-01T00:00:00",
+        "messages": messages,
+        "system_prompt": "You are a helpful assistant",
+        "temperature": 0.7,
+        "selected_models": MODEL_KEYS,
+        "summary": {"text": "earlier turns", "turns": 12},
+    }
+
+
+def _measure(convert, session):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        convert(session)
+    seconds = (time.perf_counter() - start) / REPEATS
+
+    tracemalloc.start()
+    result = convert(session)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": seconds * 1000, "peak_alloc_kb": peak / 1024}, result
+
+
+def main():
+    results = {}
+    for turns in (100, 1000):
+        session = _session(turns)
+        legacy, _ = _measure(legacy_convert_floats_to_decimal, session)
+        serializer, item = _measure(serialize_session, session)
+
+        start = time.perf_counter()
+        restored = deserialize_session(item)
+        deserialize_ms = (time.perf_counter() - start) * 1000
+
+        results[turns] = {
+            "legacy": legacy,
+            "serializer": serializer,
+            "speedup": legacy["ms"] / serializer["ms"],
+            "deserialize_ms": deserialize_ms,
+            "round_trip_ok": restored == session and isinstance(restored["temperature"], float),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Size and speed of the compressed transcript codec on synthetic multi-model sessions.
+
+Each message is encoded as it would be stored in its turn item; the report gives the
+compression ratio, the largest stored turn (against DynamoDB's 400 KB item limit) and
+encode / decode time per session.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_transcript_codec
+"""
+import json
+import random
+import time
+
+from app.services import transcript_codec
+
+MODEL_KEYS = [f"model-{i}" for i in range(1, 5)]
+ITEM_LIMIT_BYTES = 400 * 1024
+
+
+def _session(turns, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))) for _ in range(3000)]
+
+    def sentence(words):
+        return " ".join(rng.choice(vocabulary) for _ in range(words)) + "."
+
+    messages = []
+    for _ in range(turns):
+        messages.append({"role": "user", "content": sentence(rng.randint(10, 60))})
+        messages.append({
+            "role": "assistant",
+            "responses": {key: " ".join(sentence(20) for _ in range(rng.randint(5, 40))) for key in MODEL_KEYS},
+        })
+    return messages
+
+
+def _measure(messages):
+    raw = [json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for message in messages]
+
+    start = time.perf_counter()
+    encoded = [transcript_codec.encode(message) for message in messages]
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = [transcript_codec.decode(payload) for payload in encoded]
+    decode_seconds = time.perf_counter() - start
+    assert decoded == messages
+
+    raw_bytes = sum(len(item) for item in raw)
+    encoded_bytes = sum(len(item) for item in encoded)
+    largest_raw = max(len(item) for item in raw)
+    largest_encoded = max(len(item) for item in encoded)
+    return {
+        "messages": len(messages),
+        "raw_bytes": raw_bytes,
+        "encoded_bytes": encoded_bytes,
+        "compression_ratio": raw_bytes / encoded_bytes,
+        "largest_turn_raw_bytes": largest_raw,
+        "largest_turn_encoded_bytes": largest_encoded,
+        "largest_turn_fits_item_limit": largest_encoded < ITEM_LIMIT_BYTES,
+        "encode_ms": encode_seconds * 1000,
+        "decode_ms": decode_seconds * 1000,
+        "encode_mb_per_s": raw_bytes / encode_seconds / 1e6,
+        "decode_mb_per_s": raw_bytes / decode_seconds / 1e6,
+    }
+
+
+def main():
+    results = {turns: _measure(_session(turns)) for turns in (10, 100, 1000)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Streamlit script driven by bench_chat_turn through AppTest.
+
+Runs the real app.main with DynamoDB replaced by an in-memory table and counts
+script runs in session state. The model backend is selected by the benchmark
+through MODEL_BACKEND / MODEL_CONFIG_PATH before this script is first run.
+"""
+import contextlib
+import os
+import runpy
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st
+from app import chat_history_db
+
+
+class MemoryTable:
+    """Just enough of a DynamoDB Table for the chat turn path."""
+
+    def __init__(self, key_names):
+        self.key_names = key_names
+        self.items = {}
+
+    def _key(self, item):
+        return tuple(item[name] for name in self.key_names)
+
+    def put_item(self, Item, **kwargs):
+        self.items[self._key(Item)] = Item
+        return {}
+
+    def update_item(self, Key, **kwargs):
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(self._key(Key))
+        return {"Item": item} if item else {}
+
+    def query(self, **kwargs):
+        return {"Items": [self.items[key] for key in sorted(self.items)]}
+
+    def delete_item(self, Key, **kwargs):
+        self.items.pop(self._key(Key), None)
+        return {}
+
+    @contextlib.contextmanager
+    def batch_writer(self):
+        yield self
+
+
+SESSIONS_TABLE = MemoryTable(("user_id", "session_id"))
+TURNS_TABLE = MemoryTable(("session_key", "seq"))
+
+
+class MemoryDynamoDB:
+    """Stands in for the boto3 DynamoDB resource: the sessions table, else the turns table."""
+
+    def Table(self, name):
+        return SESSIONS_TABLE if name == "Arena-ChatSessions" else TURNS_TABLE
+
+
+MEMORY_DYNAMODB = MemoryDynamoDB()
+chat_history_db.get_resource = lambda service, region_name=None: MEMORY_DYNAMODB
+
+st.session_state.bench_runs = st.session_state.get("bench_runs", 0) + 1
+runpy.run_path(os.path.join(ROOT, "app.py"), run_name="__main__")
@@ -0,0 +1,57 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app.services import aws_clients
+
+
+class FakeResource:
+    def __init__(self, client=None):
+        self.meta = SimpleNamespace(client=client)
+
+
+def make_registry():
+    registry = aws_clients.ClientRegistry()
+    registry._session = mock.MagicMock()
+    registry._session.resource.side_effect = lambda *args, **kwargs: FakeResource(client=mock.MagicMock())
+    return registry
+
+
+def run_in_thread(func, timeout=5):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", func()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return thread.is_alive(), result.get("value")
+
+
+class ClientRegistryTest(unittest.TestCase):
+    def test_chat_model_creates_its_client_without_deadlocking(self):
+        registry = make_registry()
+        with mock.patch.object(aws_clients, "ChatBedrockConverse") as chat_cls:
+            hung, model = run_in_thread(lambda: registry.chat_model("model-a", "us-east-1", 0.5))
+            self.assertFalse(hung, "chat_model() deadlocked creating its bedrock-runtime client")
+            self.assertIs(model, chat_cls.return_value)
+            self.assertIs(chat_cls.call_args.kwargs["client"], registry.client("bedrock-runtime", "us-east-1"))
+
+            # Later calls are served from the cache and never block
+            hung, again = run_in_thread(lambda: registry.chat_model("model-a", "us-east-1", 0.5))
+            self.assertFalse(hung)
+            self.assertIs(again, model)
+        self.assertEqual(registry._session.client.call_count, 1)
+
+    def test_resources_are_per_thread_over_one_client(self):
+        registry = make_registry()
+        mine = registry.resource("dynamodb")
+        self.assertIs(registry.resource("dynamodb"), mine)
+
+        hung, theirs = run_in_thread(lambda: registry.resource("dynamodb"))
+        self.assertFalse(hung)
+        self.assertIsNot(theirs, mine)
+        self.assertIs(theirs.meta.client, mine.meta.client)
+        self.assertEqual(registry._session.resource.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()